@@ -23,11 +23,27 @@ logger = logging.getLogger(__name__)
 ROOT = Path(__file__).resolve().parent
 sys.path.insert(0, str(ROOT / "scripts"))
 DATA_PATH = ROOT / "data" / "hotel_reviews_processed.csv"
+PARQUET_PATH = ROOT / "data" / "hotel_reviews_processed.parquet"  # Preferido si existe
+ARROW_PATH = ROOT / "data" / "hotel_reviews_processed.arrow"  # Copia IPC mapeada en memoria (derivada del Parquet)
+SENTIMENT_CACHE_PATH = ROOT / "data" / ".cache" / "sentiment.sqlite"  # Puntajes VADER (compartido con main.py)
 
 # Importar módulos del pipeline
-from text_processing import clean_text
-from sentiment_analysis import ensure_vader, analyze_sentiment_batch, classify_sentiment
+from text_processing import clean_text, compose_reviews
+from sentiment_analysis import (
+    ensure_vader, get_analyzer, analyzer_init_seconds, analyze_sentiment_batch, classify_sentiment
+)
 from topic_modeling import extract_topics, get_extended_stop_words
+from processed_store import (
+    PROCESSED_COLUMNS, PROCESSED_CSV_NA, HOTEL_ID, HOTEL_LOCATION_COLUMNS, HotelDimension, hotels_path_for,
+    hotel_locations, read_processed, read_hotels, ensure_arrow_ipc, read_arrow_mmap
+)
+from compressed_text import CompressedTextColumn
+from tag_matrix import TagMatrix, tags_path_for
+from sentiment_cache import SentimentCache
+from dtype_optimization import (
+    optimize_dtypes, memory_mb, widen_float32, widen_frame, value_counts_observed, fill_category,
+    arrow_text, is_arrow_string, join_text, frame_to_records
+)
 
 # ============================================================================
 # MODELOS PYDANTIC
@@ -70,8 +86,13 @@ class FilterParams(BaseModel):
     hotel: Optional[str] = None
     sentiment: Optional[str] = None
     nationality: Optional[str] = None
+    city: Optional[str] = None  # Ciudad del hotel (de su dirección)
+    country: Optional[str] = None  # País del hotel
     score_min: float = 0.0
     score_max: float = 10.0
+    tags: Optional[List[str]] = None  # Reseñas con todas estas etiquetas (p. ej. "Leisure trip")
+    nights_min: Optional[int] = None  # Noches de estancia (de Tags)
+    nights_max: Optional[int] = None
     offset: int = 0  # Desplazamiento para paginación
     limit: Optional[int] = None  # Límite de resultados
 
@@ -87,11 +108,21 @@ class HotelsList(BaseModel):
     total: int
     hotels: List[str]
 
+class HotelsGeo(BaseModel):
+    """Ubicación y puntuación media de cada hotel"""
+    total: int
+    hotels: List[Dict[str, Any]]
+
 class NationalitiesList(BaseModel):
     """Lista de nacionalidades disponibles"""
     total: int
     nationalities: List[str]
 
+class TagsList(BaseModel):
+    """Etiquetas disponibles con su número de reseñas"""
+    total: int
+    tags: List[Dict[str, Any]]
+
 class TopicsAggregateResponse(BaseModel):
     """Respuesta del endpoint de tópicos agregados"""
     positive_topics: Dict[str, Any]
@@ -160,68 +191,126 @@ app.add_middleware(
 
 _cached_data: Optional[pd.DataFrame] = None
 _cache_timestamp: Optional[datetime] = None
+_text_blocks: Dict[str, CompressedTextColumn] = {}  # Solo con TEXT_STORAGE=compressed
+_column_order: List[str] = []
+_hotels: Optional[pd.DataFrame] = None  # Dimensión de hoteles (una fila por hotel_id)
+_tag_matrix: Optional[TagMatrix] = None  # Etiquetas por reseña (multi-hot), mismas filas que el dataset
+_sentiment_cache: Optional[SentimentCache] = None  # Se abre al primer análisis
 CACHE_TTL_SECONDS = 300  # 5 minutos
 
+# Tipos compactos en memoria (nombres ya normalizados): filtros y conteos sobre códigos enteros.
+# Dirección, Average_Score, lat y lng viven solo en la dimensión de hoteles.
+API_CATEGORY_COLUMNS = ["Nombre del Hotel", "Nacionalidad del Revisor", "Etiqueta de Sentimiento"]
+API_FLOAT32_COLUMNS = ["Puntuación del Revisor", "compound", "pos", "neu", "neg"]
+
+# Texto de reseñas: "arrow" (buffers contiguos, por defecto), "object" (str de Python)
+# o "compressed" (bloques zstd fuera del DataFrame; se descomprimen solo los bloques usados)
+API_TEXT_COLUMNS = ["Reseña Positiva", "Reseña Negativa", "Tags"]
+TEXT_STORAGE = os.getenv("TEXT_STORAGE", "arrow").lower()
+
+# "Texto de Reseña" no se guarda en cache: se deriva de estos segmentos al usarse
+REVIEW_SEGMENT_COLUMNS = ["Reseña Positiva", "Reseña Negativa"]
+
 def get_cached_data() -> pd.DataFrame:
     """Obtiene datos con cache"""
-    global _cached_data, _cache_timestamp
+    global _cached_data, _cache_timestamp, _text_blocks, _column_order, _hotels, _tag_matrix
     
     now = datetime.now()
     
-    # Si hay cache válido, retornar
+    # Si hay cache válido, retornar (copia superficial: quien la recibe solo
+    # agrega o reemplaza columnas, no escribe en los datos compartidos)
     if _cached_data is not None and _cache_timestamp is not None:
         if (now - _cache_timestamp).total_seconds() < CACHE_TTL_SECONDS:
-            return _cached_data.copy()
+            return _cached_data.copy(deep=False)
     
-    # Cargar datos
-    logger.info(f"Cargando datos desde {DATA_PATH}")
+    # Cargar datos (Parquet columnar si existe, CSV como respaldo)
+    data_path = PARQUET_PATH if PARQUET_PATH.exists() else DATA_PATH
+    logger.info(f"Cargando datos desde {data_path}")
     
-    if not DATA_PATH.exists():
-        raise HTTPException(status_code=500, detail=f"Dataset no encontrado en {DATA_PATH}")
+    if not data_path.exists():
+        raise HTTPException(status_code=500, detail=f"Dataset no encontrado en {data_path}")
     
     try:
-        df = pd.read_csv(DATA_PATH, encoding='utf-8')
+        hotels_path = hotels_path_for(data_path)
+        if data_path == PARQUET_PATH:
+            # Arrow IPC mapeado en memoria: el texto se comparte entre workers (page cache)
+            ensure_arrow_ipc(PARQUET_PATH, ARROW_PATH, columns=[HOTEL_ID] + PROCESSED_COLUMNS)
+            df = read_arrow_mmap(ARROW_PATH, columns=[HOTEL_ID] + PROCESSED_COLUMNS)
+            hotels = read_processed(hotels_path) if hotels_path.exists() else None
+        else:
+            # review_text (si existe en CSV antiguos) se ignora: se deriva de los segmentos,
+            # leídos tal cual ("None", "NA"... son texto de la reseña, no nulos)
+            df = pd.read_csv(DATA_PATH, encoding='utf-8', usecols=lambda c: c != "review_text", **PROCESSED_CSV_NA)
+            hotels = read_hotels(DATA_PATH)
         logger.info(f"Dataset cargado: {len(df)} reseñas")
         
+        # Archivos sin dimensión de hoteles: se normalizan al cargar
+        if HOTEL_ID not in df.columns or hotels is None:
+            dimension = HotelDimension()
+            df = dimension.split(df.drop(columns=HOTEL_ID, errors="ignore"))
+            hotels = dimension.to_frame()
+        logger.info(f"Dimensión de hoteles: {len(hotels)} hoteles")
+        
+        # Dimensiones anteriores sin ciudad/país: se derivan de la dirección (una vez por hotel)
+        if "Hotel_Address" in hotels.columns and not set(HOTEL_LOCATION_COLUMNS) <= set(hotels.columns):
+            hotels = hotels.drop(columns=HOTEL_LOCATION_COLUMNS, errors="ignore")
+            hotels = pd.concat([hotels, hotel_locations(hotels["Hotel_Address"])], axis=1)
+        
+        # Etiquetas: índice del pipeline si corresponde a este archivo; si no, se parsean al cargar
+        tags_path = tags_path_for(data_path)
+        tag_matrix = None
+        if tags_path.exists() and tags_path.stat().st_mtime >= data_path.stat().st_mtime:
+            tag_matrix = TagMatrix.load(tags_path)
+        if tag_matrix is None or len(tag_matrix) != len(df):
+            tag_matrix = TagMatrix.from_series(df["Tags"] if "Tags" in df.columns else pd.Series(None, index=df.index))
+        logger.info(f"Etiquetas: {len(tag_matrix.vocabulary)} distintas, {tag_matrix.matrix.nnz} asignaciones")
+        
         # Normalizar nombres de columnas (solo las que existen)
         rename_map = {}
-        if "Hotel_Name" in df.columns:
+        loaded_columns = set(df.columns) | set(hotels.columns)
+        if "Hotel_Name" in loaded_columns:
             rename_map["Hotel_Name"] = "Nombre del Hotel"
-        if "Reviewer_Nationality" in df.columns:
+        if "Reviewer_Nationality" in loaded_columns:
             rename_map["Reviewer_Nationality"] = "Nacionalidad del Revisor"
-        if "Positive_Review" in df.columns:
+        if "Positive_Review" in loaded_columns:
             rename_map["Positive_Review"] = "Reseña Positiva"
-        if "Negative_Review" in df.columns:
+        if "Negative_Review" in loaded_columns:
             rename_map["Negative_Review"] = "Reseña Negativa"
-        if "review_text" in df.columns:
-            rename_map["review_text"] = "Texto de Reseña"
-        if "sentiment_label" in df.columns:
+        if "sentiment_label" in loaded_columns:
             rename_map["sentiment_label"] = "Etiqueta de Sentimiento"
-        if "Reviewer_Score" in df.columns:
+        if "Reviewer_Score" in loaded_columns:
             rename_map["Reviewer_Score"] = "Puntuación del Revisor"
+        if "Hotel_City" in loaded_columns:
+            rename_map["Hotel_City"] = "Ciudad del Hotel"
+        if "Hotel_Country" in loaded_columns:
+            rename_map["Hotel_Country"] = "País del Hotel"
         
         df = df.rename(columns=rename_map)
+        hotels = hotels.rename(columns=rename_map)
         
         # Limpiar datos
         df["Puntuación del Revisor"] = pd.to_numeric(df["Puntuación del Revisor"], errors="coerce")
-        df["lat"] = pd.to_numeric(df.get("lat", pd.Series()), errors="coerce")
-        df["lng"] = pd.to_numeric(df.get("lng", pd.Series()), errors="coerce")
+        hotels["lat"] = pd.to_numeric(hotels.get("lat", pd.Series()), errors="coerce")
+        hotels["lng"] = pd.to_numeric(hotels.get("lng", pd.Series()), errors="coerce")
         
         # Rellenar nulos
-        df["Nombre del Hotel"] = df["Nombre del Hotel"].fillna("Hotel Desconocido")
-        df["Nacionalidad del Revisor"] = df["Nacionalidad del Revisor"].fillna("Sin Especificar")
+        hotels["Nombre del Hotel"] = fill_category(hotels["Nombre del Hotel"], "Hotel Desconocido").astype(object)
+        hotels["review_count"] = np.bincount(df[HOTEL_ID], minlength=len(hotels))
+        for col in HOTEL_LOCATION_COLUMNS:
+            col = rename_map.get(col, col)
+            if col in hotels.columns:
+                hotels[col] = fill_category(hotels[col].astype("category"), "Sin Especificar")
+        
+        # Join perezoso: por reseña solo el código del nombre (para filtros y agrupaciones);
+        # el resto de atributos se toma de la dimensión al materializar filas
+        hotel_names = pd.Categorical(hotels["Nombre del Hotel"], categories=sorted(hotels["Nombre del Hotel"].unique()))
+        df.insert(1, "Nombre del Hotel", pd.Categorical.from_codes(
+            hotel_names.codes[df[HOTEL_ID].to_numpy()], dtype=hotel_names.dtype
+        ))
+        df["Nacionalidad del Revisor"] = fill_category(df["Nacionalidad del Revisor"], "Sin Especificar")
         df["Reseña Positiva"] = df["Reseña Positiva"].fillna("")
         df["Reseña Negativa"] = df["Reseña Negativa"].fillna("")
         
-        # Crear columna "Texto de Reseña" si no existe
-        if "Texto de Reseña" not in df.columns or df["Texto de Reseña"].isna().all():
-            logger.info("Creando columna 'Texto de Reseña' combinando positivas y negativas")
-            df["Texto de Reseña"] = (
-                df["Reseña Positiva"].astype(str) + " " + df["Reseña Negativa"].astype(str)
-            ).str.strip()
-        
-        df["Texto de Reseña"] = df["Texto de Reseña"].fillna("")
-        
         # Calcular sentiment si no existe la columna
         if "Etiqueta de Sentimiento" not in df.columns:
             logger.info("Calculando sentimiento para todas las reseñas (esto puede tardar)...")
@@ -237,55 +326,181 @@ def get_cached_data() -> pd.DataFrame:
             df["Etiqueta de Sentimiento"] = df["Puntuación del Revisor"].apply(calc_sentiment_label)
             logger.info("Sentimiento calculado basado en puntuaciones")
         else:
-            df["Etiqueta de Sentimiento"] = df["Etiqueta de Sentimiento"].fillna("neutro")
+            df["Etiqueta de Sentimiento"] = fill_category(df["Etiqueta de Sentimiento"], "neutro")
         
         median_score = df["Puntuación del Revisor"].median()
         df["Puntuación del Revisor"] = df["Puntuación del Revisor"].fillna(median_score)
         
+        # Tipos compactos: categóricas para dimensiones, float32 para medidas
+        memory_before = memory_mb(df)
+        df = optimize_dtypes(
+            df,
+            category_columns=API_CATEGORY_COLUMNS,
+            float32_columns=API_FLOAT32_COLUMNS,
+            verbose=False
+        )
+        
+        # Orden de columnas de las reseñas materializadas (sin hotel_id)
+        logical_order = [rename_map.get(c, c) for c in PROCESSED_COLUMNS]
+        column_order = [c for c in logical_order if c in df.columns or c in hotels.columns]
+        column_order += [c for c in df.columns if c not in column_order and c != HOTEL_ID]
+        
+        if TEXT_STORAGE == "arrow":
+            df = arrow_text(df, API_TEXT_COLUMNS, verbose=False)
+        elif TEXT_STORAGE == "compressed":
+            # El texto sale del DataFrame: los metadatos quedan sin comprimir
+            text_blocks = {
+                col: CompressedTextColumn.from_series(df[col])
+                for col in API_TEXT_COLUMNS if col in df.columns
+            }
+            df = df.drop(columns=list(text_blocks))
+            _text_blocks = text_blocks
+            compressed_mb = sum(c.nbytes for c in text_blocks.values()) / 1024**2
+            logger.info(f"Texto comprimido (zstd): {compressed_mb:,.1f} MB en {len(text_blocks)} columnas")
+        else:
+            for col in API_TEXT_COLUMNS:
+                if col in df.columns and is_arrow_string(df[col]):
+                    df[col] = df[col].astype(object)
+        logger.info(f"Memoria del dataset: {memory_before:,.1f} MB → {memory_mb(df):,.1f} MB")
+        
+        _hotels = hotels
+        _tag_matrix = tag_matrix
+        _column_order = column_order
         _cached_data = df
         _cache_timestamp = now
         
-        return df.copy()
+        return df.copy(deep=False)
         
     except Exception as e:
         logger.error(f"Error cargando datos: {e}")
         raise HTTPException(status_code=500, detail=f"Error cargando dataset: {str(e)}")
 
-def apply_filters(df: pd.DataFrame, filters: FilterParams) -> pd.DataFrame:
-    """Aplica filtros al dataframe con soporte para paginación (offset/limit)"""
-    result = df.copy()
+def with_review_text(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agrega "Texto de Reseña" (tras "Reseña Negativa") derivándola de los dos
+    segmentos, solo para las filas recibidas. Mismo texto que review_text del pipeline.
+    """
+    df = df.copy(deep=False)
+    df.insert(
+        df.columns.get_loc("Reseña Negativa") + 1,
+        "Texto de Reseña",
+        compose_reviews(df["Reseña Positiva"], df["Reseña Negativa"])
+    )
+    return df
+
+def take_rows(df: pd.DataFrame, positions: np.ndarray, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Materializa las filas (por posición) y columnas pedidas. Las columnas de
+    texto comprimido se descomprimen solo en los bloques que tocan esas filas y
+    los atributos de hotel se toman de la dimensión por hotel_id.
+    """
+    if columns is None:
+        columns = _column_order
+    
+    frame_columns = [c for c in columns if c in df.columns]
+    result = df.iloc[positions, df.columns.get_indexer(frame_columns)].reset_index(drop=True)
+    
+    hotel_ids = None
+    for col in columns:
+        if col in df.columns:
+            continue
+        if col in _text_blocks:
+            result[col] = _text_blocks[col].take(positions)
+        elif _hotels is not None and col in _hotels.columns:
+            if hotel_ids is None:
+                hotel_ids = df[HOTEL_ID].to_numpy()[positions]
+            result[col] = _hotels[col].to_numpy()[hotel_ids]
+    
+    return result[[c for c in columns if c in result.columns]]
+
+def get_sentiment_cache() -> Optional[SentimentCache]:
+    """Cache persistente de puntajes VADER (None si no se puede abrir, p. ej. disco de solo lectura)"""
+    global _sentiment_cache
+    if _sentiment_cache is None:
+        try:
+            _sentiment_cache = SentimentCache(SENTIMENT_CACHE_PATH)
+        except Exception as e:
+            logger.warning(f"Cache de sentimiento no disponible: {e}")
+            return None
+    return _sentiment_cache
+
+def get_cached_hotels() -> pd.DataFrame:
+    """Dimensión de hoteles del dataset en cache (recarga si venció)"""
+    if _hotels is None or _cache_timestamp is None or \
+            (datetime.now() - _cache_timestamp).total_seconds() >= CACHE_TTL_SECONDS:
+        get_cached_data()
+    return _hotels
+
+def get_cached_tags() -> TagMatrix:
+    """Matriz de etiquetas del dataset en cache (recarga si venció)"""
+    if _tag_matrix is None or _cache_timestamp is None or \
+            (datetime.now() - _cache_timestamp).total_seconds() >= CACHE_TTL_SECONDS:
+        get_cached_data()
+    return _tag_matrix
+
+def hotel_attribute_mask(df: pd.DataFrame, column: str, value: Any) -> np.ndarray:
+    """Máscara por reseña de un atributo de la dimensión de hoteles: se compara una vez por hotel"""
+    matches = (get_cached_hotels()[column] == value).to_numpy()
+    return matches[df[HOTEL_ID].to_numpy()]
+
+def filter_positions(df: pd.DataFrame, filters: FilterParams) -> np.ndarray:
+    """
+    Posiciones de las filas que cumplen los filtros, con paginación (offset/limit).
+    Calcula una única máscara booleana sin materializar filas.
+    """
+    mask = np.ones(len(df), dtype=bool)
     
     # Aplicar filtros de criterios
     if filters.hotel and filters.hotel != "(Todos)":
-        result = result[result["Nombre del Hotel"] == filters.hotel]
+        mask &= (df["Nombre del Hotel"] == filters.hotel).to_numpy()
     
     if filters.sentiment and filters.sentiment != "(Todos)":
-        result = result[result["Etiqueta de Sentimiento"] == filters.sentiment]
+        mask &= (df["Etiqueta de Sentimiento"] == filters.sentiment).to_numpy()
     
     if filters.nationality and filters.nationality != "(Todas)":
-        result = result[result["Nacionalidad del Revisor"] == filters.nationality]
+        mask &= (df["Nacionalidad del Revisor"] == filters.nationality).to_numpy()
     
-    # Filtro por score
-    result = result[
-        (result["Puntuación del Revisor"] >= filters.score_min) &
-        (result["Puntuación del Revisor"] <= filters.score_max)
-    ]
+    # Destino: códigos de ciudad/país en la dimensión de hoteles, vía hotel_id
+    if filters.city and filters.city != "(Todas)":
+        mask &= hotel_attribute_mask(df, "Ciudad del Hotel", filters.city)
+    
+    if filters.country and filters.country != "(Todos)":
+        mask &= hotel_attribute_mask(df, "País del Hotel", filters.country)
     
-    # Reset index antes de aplicar offset (importante para iloc)
-    result = result.reset_index(drop=True)
+    # Etiquetas y noches: desde la matriz multi-hot, sin buscar en el texto de Tags
+    if filters.tags:
+        mask &= get_cached_tags().mask(filters.tags)
     
-    # Aplicar paginación: offset + limit
+    if filters.nights_min is not None or filters.nights_max is not None:
+        mask &= get_cached_tags().nights_mask(filters.nights_min, filters.nights_max)
+    
+    # Filtro por score
+    # (umbrales en el mismo dtype que la columna, p. ej. float32)
+    scores = df["Puntuación del Revisor"]
+    score_min, score_max = scores.dtype.type(filters.score_min), scores.dtype.type(filters.score_max)
+    mask &= ((scores >= score_min) & (scores <= score_max)).to_numpy()
+    
+    # Aplicar paginación sobre las posiciones: offset + limit
+    positions = np.flatnonzero(mask)
     if filters.offset > 0:
-        if filters.offset < len(result):
-            result = result.iloc[filters.offset:]
-        else:
-            # Offset fuera de rango, retornar DataFrame vacío
-            result = result.iloc[0:0]
+        positions = positions[filters.offset:]
     
     if filters.limit and filters.limit > 0:
-        result = result.head(filters.limit)
+        positions = positions[:filters.limit]
     
-    return result
+    return positions
+
+def sample_positions(positions: np.ndarray, n: int, random_state: int = 42) -> np.ndarray:
+    """Muestra de posiciones (mismas filas y orden que DataFrame.sample sobre esas filas)"""
+    return pd.Series(positions).sample(n=n, random_state=random_state).to_numpy()
+
+def apply_filters(df: pd.DataFrame, filters: FilterParams, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Aplica filtros al dataframe con soporte para paginación (offset/limit).
+    Primero calcula una máscara booleana y solo materializa las filas de la
+    página (y las columnas pedidas), sin copiar texto que no se va a usar.
+    """
+    return take_rows(df, filter_positions(df, filters), columns)
 
 # ============================================================================
 # ENDPOINTS
@@ -303,7 +518,9 @@ async def root():
             "GET /health": "Health check",
             "GET /stats": "Estadísticas del dataset",
             "GET /hotels": "Lista de hoteles",
+            "GET /hotels/geo": "Ubicación de los hoteles",
             "GET /nationalities": "Lista de nacionalidades",
+            "GET /tags": "Lista de etiquetas (tipo de viaje, habitación...)",
             "POST /reviews/filter": "Obtener reseñas filtradas",
             "POST /reviews/analyze": "Analizar una reseña individual",
             "POST /reviews/topics": "Obtener tópicos agregados por sentimiento",
@@ -324,6 +541,8 @@ async def health_check():
             "dataset_loaded": True,
             "total_reviews": len(df),
             "vader_available": True,
+            "vader_init_seconds": analyzer_init_seconds(),
+            "sentiment_cache": _sentiment_cache.stats() if _sentiment_cache is not None else None,
             "cache_age_seconds": (datetime.now() - _cache_timestamp).total_seconds() if _cache_timestamp else None,
             "timestamp": datetime.now().isoformat()
         }
@@ -342,7 +561,7 @@ async def get_stats():
         df = get_cached_data()
         
         # Calcular distribución de sentimientos
-        sentiment_dist = df["Etiqueta de Sentimiento"].value_counts().to_dict()
+        sentiment_dist = value_counts_observed(df["Etiqueta de Sentimiento"]).to_dict()
         
         # Calcular distribución de puntuaciones
         score_bins = pd.cut(df["Puntuación del Revisor"], bins=[0, 2, 4, 6, 8, 10])
@@ -351,9 +570,9 @@ async def get_stats():
         
         return DatasetStats(
             total_reviews=len(df),
-            total_hotels=df["Nombre del Hotel"].nunique(),
+            total_hotels=get_cached_hotels()["Nombre del Hotel"].nunique(),
             total_countries=df["Nacionalidad del Revisor"].nunique(),
-            average_score=float(df["Puntuación del Revisor"].mean()),
+            average_score=float(widen_float32(df["Puntuación del Revisor"]).mean()),
             sentiment_distribution=sentiment_dist,
             score_distribution=score_dist
         )
@@ -366,8 +585,8 @@ async def get_stats():
 async def get_hotels(limit: int = Query(None, ge=1, le=1000, description="Limitar número de hoteles")):
     """Obtener lista de hoteles disponibles"""
     try:
-        df = get_cached_data()
-        hotels = sorted(df["Nombre del Hotel"].unique().tolist())
+        # Directo de la dimensión de hoteles (una fila por hotel)
+        hotels = sorted(get_cached_hotels()["Nombre del Hotel"].unique().tolist())
         
         if limit:
             hotels = hotels[:limit]
@@ -381,6 +600,34 @@ async def get_hotels(limit: int = Query(None, ge=1, le=1000, description="Limita
         logger.error(f"Error getting hotels: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/hotels/geo", response_model=HotelsGeo, tags=["Dataset"])
+async def get_hotels_geo():
+    """Obtener ubicación (lat/lng), dirección, puntuación media y número de reseñas por hotel"""
+    try:
+        hotels = get_cached_hotels().dropna(subset=["lat", "lng"])
+        records = [
+            {
+                "hotel": row["Nombre del Hotel"],
+                "address": None if pd.isna(row.get("Hotel_Address")) else str(row.get("Hotel_Address")),
+                "average_score": None if pd.isna(row.get("Average_Score")) else float(row.get("Average_Score")),
+                "city": None if pd.isna(row.get("Ciudad del Hotel")) else str(row.get("Ciudad del Hotel")),
+                "country": None if pd.isna(row.get("País del Hotel")) else str(row.get("País del Hotel")),
+                "lat": float(row["lat"]),
+                "lng": float(row["lng"]),
+                "review_count": int(row["review_count"])
+            }
+            for _, row in hotels.iterrows()
+        ]
+        
+        return HotelsGeo(
+            total=len(records),
+            hotels=records
+        )
+        
+    except Exception as e:
+        logger.error(f"Error getting hotels geo: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/nationalities", response_model=NationalitiesList, tags=["Dataset"])
 async def get_nationalities(limit: int = Query(50, ge=1, le=500, description="Limitar número de nacionalidades")):
     """Obtener lista de nacionalidades disponibles"""
@@ -397,6 +644,22 @@ async def get_nationalities(limit: int = Query(50, ge=1, le=500, description="Li
         logger.error(f"Error getting nationalities: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/tags", response_model=TagsList, tags=["Dataset"])
+async def get_tags(limit: int = Query(50, ge=1, le=5000, description="Limitar número de etiquetas")):
+    """Obtener etiquetas disponibles (de Tags) con su número de reseñas, de más a menos frecuente"""
+    try:
+        counts = get_cached_tags().counts().head(limit)
+        tags = [{"tag": tag, "count": int(count)} for tag, count in counts.items()]
+        
+        return TagsList(
+            total=len(tags),
+            tags=tags
+        )
+        
+    except Exception as e:
+        logger.error(f"Error getting tags: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/reviews/filter", response_model=ReviewsResponse, tags=["Reviews"])
 async def filter_reviews(filters: FilterParams):
     """
@@ -405,8 +668,11 @@ async def filter_reviews(filters: FilterParams):
     - **hotel**: Filtrar por nombre de hotel específico
     - **sentiment**: Filtrar por sentimiento (positivo, negativo, neutro)
     - **nationality**: Filtrar por nacionalidad del revisor
+    - **city** / **country**: Filtrar por ciudad o país del hotel
     - **score_min**: Puntuación mínima (0-10)
     - **score_max**: Puntuación máxima (0-10)
+    - **tags**: Solo reseñas con todas estas etiquetas (p. ej. ["Leisure trip", "Couple"])
+    - **nights_min** / **nights_max**: Noches de estancia (según Tags)
     - **offset**: Desplazamiento para paginación (por defecto 0)
     - **limit**: Número máximo de reseñas a retornar (por defecto 10,000 para evitar "Response too large")
     
@@ -419,22 +685,22 @@ async def filter_reviews(filters: FilterParams):
         total_before = len(df)
         logger.info(f"Total reviews in dataset: {total_before}")
         
-        # Aplicar filtros (incluye offset y limit internamente)
-        df_filtered = apply_filters(df, filters)
-        logger.info(f"After filters: {len(df_filtered)} reviews")
-        
         # Si no se especifica limit, usar límite seguro por defecto
         # Cloud Run tiene límite de respuesta HTTP de ~32MB
         DEFAULT_LIMIT = 10000  # Límite seguro para evitar "Response too large"
+        page_filters = filters
         if not filters.limit or filters.limit <= 0:
             logger.info(f"No limit specified, applying default: {DEFAULT_LIMIT}")
-            # El límite ya se aplica en apply_filters, solo ajustamos el objeto filters
-            if len(df_filtered) > DEFAULT_LIMIT:
-                df_filtered = df_filtered.head(DEFAULT_LIMIT)
+            # Se pasa a apply_filters para materializar solo la página
+            page_filters = filters.model_copy(update={"limit": DEFAULT_LIMIT})
+        
+        # Aplicar filtros (incluye offset y limit internamente)
+        df_filtered = apply_filters(df, page_filters)
+        logger.info(f"After filters: {len(df_filtered)} reviews")
         
         # Convertir a lista de diccionarios (optimizado para JSON)
         logger.info(f"Converting {len(df_filtered)} rows to dict...")
-        reviews = df_filtered.to_dict('records')
+        reviews = frame_to_records(widen_frame(with_review_text(df_filtered)))
         
         logger.info(f"Returning {len(reviews)} reviews (offset={filters.offset}, limit={filters.limit or DEFAULT_LIMIT})")
         
@@ -466,10 +732,7 @@ async def analyze_review(review: ReviewInput):
             raise HTTPException(status_code=400, detail="Texto muy corto después de limpieza")
         
         # Análisis de sentimiento
-        ensure_vader()
-        from nltk.sentiment.vader import SentimentIntensityAnalyzer
-        sia = SentimentIntensityAnalyzer()
-        scores = sia.polarity_scores(cleaned_text)
+        scores = analyze_sentiment_batch([cleaned_text], cache=get_sentiment_cache()).iloc[0]
         
         sentiment_label = classify_sentiment(scores['compound'])
         
@@ -479,7 +742,11 @@ async def analyze_review(review: ReviewInput):
             df_context = get_cached_data()
             sample_size = min(5000, len(df_context))
             df_for_topics = pd.concat([
-                df_context.sample(n=sample_size, random_state=42)[["Texto de Reseña"]].rename(columns={"Texto de Reseña": "review_text"}),
+                with_review_text(take_rows(
+                    df_context,
+                    sample_positions(np.arange(len(df_context)), sample_size),
+                    REVIEW_SEGMENT_COLUMNS
+                ))[["Texto de Reseña"]].rename(columns={"Texto de Reseña": "review_text"}),
                 pd.DataFrame({"review_text": [cleaned_text]})
             ]).reset_index(drop=True)
             
@@ -532,7 +799,7 @@ async def get_aggregated_topics(
         df = get_cached_data()
         
         # Aplicar filtros base
-        df_filtered = apply_filters(df, filters)
+        df_filtered = apply_filters(df, filters, columns=["Etiqueta de Sentimiento"] + REVIEW_SEGMENT_COLUMNS)
         
         if len(df_filtered) < 100:
             raise HTTPException(
@@ -541,6 +808,7 @@ async def get_aggregated_topics(
             )
         
         # Separar por sentimiento
+        df_filtered = with_review_text(df_filtered)
         df_positive = df_filtered[df_filtered["Etiqueta de Sentimiento"] == "positivo"]
         df_negative = df_filtered[df_filtered["Etiqueta de Sentimiento"] == "negativo"]
         
@@ -625,26 +893,29 @@ async def get_wordcloud_data(
         df = get_cached_data()
         logger.info(f"Dataset cargado: {len(df)} reseñas")
         
-        df_filtered = apply_filters(df, filters)
-        logger.info(f"Después de filtros: {len(df_filtered)} reseñas")
+        text_column = "Texto de Reseña"
+        positions = filter_positions(df, filters)
+        logger.info(f"Después de filtros: {len(positions)} reseñas")
         
-        if len(df_filtered) == 0:
+        if len(positions) == 0:
             logger.warning("No hay reseñas después de aplicar filtros")
             raise HTTPException(status_code=404, detail="No hay reseñas con los filtros aplicados")
         
-        # Samplear si es necesario
-        if len(df_filtered) > sample_size:
-            df_filtered = df_filtered.sample(n=sample_size, random_state=42)
-            logger.info(f"Sampleado a {len(df_filtered)} reseñas")
+        # Samplear si es necesario (antes de leer el texto)
+        if len(positions) > sample_size:
+            positions = sample_positions(positions, sample_size)
+            logger.info(f"Sampleado a {len(positions)} reseñas")
+        
+        # Texto (y texto combinado) solo de las reseñas sampleadas
+        df_filtered = with_review_text(take_rows(df, positions, REVIEW_SEGMENT_COLUMNS))
         
         # Combinar todo el texto
         logger.info("Combinando texto de reseñas...")
-        text_column = "Texto de Reseña"
         if text_column not in df_filtered.columns:
             logger.error(f"Columna '{text_column}' no encontrada. Columnas disponibles: {df_filtered.columns.tolist()}")
             raise HTTPException(status_code=500, detail=f"Columna '{text_column}' no encontrada en dataset")
         
-        all_text = " ".join(df_filtered[text_column].dropna().astype(str).tolist())
+        all_text = join_text(df_filtered[text_column])
         logger.info(f"Texto combinado: {len(all_text)} caracteres")
         
         if len(all_text.strip()) == 0:
@@ -721,6 +992,9 @@ async def get_wordcloud_data(
 # ENDPOINTS - MÉTRICAS AGREGADAS
 # ============================================================================
 
+# Columnas que usan las métricas (ninguna de texto)
+METRIC_COLUMNS = ["Nombre del Hotel", "Nacionalidad del Revisor", "Etiqueta de Sentimiento", "Puntuación del Revisor"]
+
 @app.post("/metrics/aggregated", response_model=AggregatedMetrics, tags=["Metrics"])
 async def get_aggregated_metrics(filters: FilterParams):
     """
@@ -734,7 +1008,8 @@ async def get_aggregated_metrics(filters: FilterParams):
         df = get_cached_data()
         
         # Aplicar filtros
-        filtered_df = apply_filters(df, filters)
+        filtered_df = apply_filters(df, filters, columns=METRIC_COLUMNS)
+        filtered_df["Puntuación del Revisor"] = widen_float32(filtered_df["Puntuación del Revisor"])
         
         if filtered_df.empty:
             return AggregatedMetrics(
@@ -750,7 +1025,7 @@ async def get_aggregated_metrics(filters: FilterParams):
             )
         
         # Distribución de sentimientos
-        sentiment_counts = filtered_df["Etiqueta de Sentimiento"].value_counts().to_dict()
+        sentiment_counts = value_counts_observed(filtered_df["Etiqueta de Sentimiento"]).to_dict()
         total = len(filtered_df)
         sentiment_percentages = {k: round((v/total)*100, 2) for k, v in sentiment_counts.items()}
         
@@ -763,7 +1038,7 @@ async def get_aggregated_metrics(filters: FilterParams):
         median_score = float(filtered_df["Puntuación del Revisor"].median())
         
         # Top 10 hoteles
-        top_hotels_data = filtered_df.groupby("Nombre del Hotel").agg({
+        top_hotels_data = filtered_df.groupby("Nombre del Hotel", observed=True).agg({
             "Puntuación del Revisor": ["count", "mean"]
         }).reset_index()
         top_hotels_data.columns = ["hotel", "review_count", "avg_score"]
@@ -774,7 +1049,7 @@ async def get_aggregated_metrics(filters: FilterParams):
             hotel["avg_score"] = round(float(hotel["avg_score"]), 2)
         
         # Top 10 nacionalidades
-        top_nationalities_data = filtered_df["Nacionalidad del Revisor"].value_counts().head(10)
+        top_nationalities_data = value_counts_observed(filtered_df["Nacionalidad del Revisor"]).head(10)
         top_nationalities = [
             {"nationality": str(nat), "review_count": int(count)}
             for nat, count in top_nationalities_data.items()
@@ -801,7 +1076,7 @@ async def get_aggregated_metrics(filters: FilterParams):
 @app.post("/metrics/distribution", response_model=DistributionData, tags=["Metrics"])
 async def get_distribution(
     filters: FilterParams,
-    metric: str = Query(..., description="Métrica a distribuir: 'sentiment', 'score', 'hotel', 'nationality'")
+    metric: str = Query(..., description="Métrica a distribuir: 'sentiment', 'score', 'hotel', 'nationality', 'city', 'country'")
 ):
     """
     Obtiene distribución de una métrica específica con filtros.
@@ -813,7 +1088,8 @@ async def get_distribution(
         # Obtener datos
         df = get_cached_data()
         
-        filtered_df = apply_filters(df, filters)
+        filtered_df = apply_filters(df, filters, columns=METRIC_COLUMNS)
+        filtered_df["Puntuación del Revisor"] = widen_float32(filtered_df["Puntuación del Revisor"])
         
         if filtered_df.empty:
             return DistributionData(
@@ -826,13 +1102,20 @@ async def get_distribution(
         total = len(filtered_df)
         
         if metric == "sentiment":
-            dist = filtered_df["Etiqueta de Sentimiento"].value_counts()
+            dist = value_counts_observed(filtered_df["Etiqueta de Sentimiento"])
         elif metric == "score":
             dist = filtered_df["Puntuación del Revisor"].value_counts().sort_index()
         elif metric == "hotel":
-            dist = filtered_df["Nombre del Hotel"].value_counts().head(20)
+            dist = value_counts_observed(filtered_df["Nombre del Hotel"]).head(20)
         elif metric == "nationality":
-            dist = filtered_df["Nacionalidad del Revisor"].value_counts().head(20)
+            dist = value_counts_observed(filtered_df["Nacionalidad del Revisor"]).head(20)
+        elif metric in ("city", "country"):
+            # Agrupación por códigos del hotel: sin materializar texto por reseña
+            values = get_cached_hotels()["Ciudad del Hotel" if metric == "city" else "País del Hotel"]
+            hotel_ids = df[HOTEL_ID].to_numpy()[filter_positions(df, filters)]
+            dist = value_counts_observed(pd.Series(pd.Categorical.from_codes(
+                values.cat.codes.to_numpy()[hotel_ids], dtype=values.dtype
+            ))).head(20)
         else:
             raise HTTPException(status_code=400, detail=f"Invalid metric: {metric}")
         
@@ -866,8 +1149,8 @@ async def startup_event():
     try:
         df = get_cached_data()
         logger.info(f"API iniciada exitosamente. Dataset: {len(df)} reseñas")
-        ensure_vader()
-        logger.info("VADER inicializado")
+        get_analyzer()
+        logger.info(f"VADER inicializado en {analyzer_init_seconds():.2f} s")
     except Exception as e:
         logger.error(f"Error en startup: {e}")
         raise
@@ -885,5 +1168,6 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=port,
         reload=False,
+        workers=int(os.getenv("WEB_CONCURRENCY", 1)),
         log_level="info"
     )
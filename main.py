@@ -4,28 +4,42 @@ from pathlib import Path
 # Importar módulos del proyecto
 from scripts.data_processing import (
     load_dataset, 
+    load_dataset_chunks,
     get_sample, 
     save_processed_data,
     show_sentiment_distribution,
     get_data_summary
 )
 from scripts.data_cleaning import (
-    clean_and_compose_reviews,
     remove_duplicates,
     handle_missing_values,
     validate_data_types,
     standardize_countries
 )
-from scripts.text_processing import clean_dataframe_reviews
-from scripts.sentiment_analysis import sentiment_chunked
+from scripts.text_processing import clean_reviews, add_review_text
+from scripts.sentiment_analysis import sentiment_chunked, sentiment_iter
 from scripts.topic_modeling import extract_topics, print_topics
+from scripts.chunked_pipeline import clean_chunks, count_rows, skip_seen_rows, compact_chunks, parallel_clean
+from scripts.processed_store import (
+    write_chunks, manifest_path_for, read_manifest, write_manifest, read_column_batches
+)
+from scripts.dtype_optimization import arrow_text, peak_rss_mb
+from scripts.checkpoints import CheckpointStore, code_stamp, file_digest, stage_key
+from scripts.row_dedup import FINGERPRINT_BITS, SeenRows, dedup_path_for
+from scripts.near_duplicates import mark_near_duplicates
+from scripts.tag_matrix import write_tag_matrix
+from scripts.sentiment_cache import SentimentCache
 
 
 # Configuración de rutas
 ROOT = Path(__file__).resolve().parent
 DATA_DIR = ROOT / "data"
 DATA_IN = DATA_DIR / "Hotel_Reviews.csv"
-DATA_OUT = DATA_DIR / "hotel_reviews_processed.csv"
+DATA_OUT = DATA_DIR / "hotel_reviews_processed.parquet"
+DATA_OUT_CSV = DATA_DIR / "hotel_reviews_processed.csv"
+CACHE_DIR = DATA_DIR / ".cache"  # Checkpoints por fase
+COUNTRY_CACHE = CACHE_DIR / "countries.json"  # Mapeo país crudo → canónico
+SENTIMENT_CACHE = CACHE_DIR / "sentiment.sqlite"  # Puntajes VADER por hash del texto limpio
 
 
 def parse_arguments():
@@ -56,6 +70,85 @@ def parse_arguments():
         help="Escribir resultados incrementalmente (menor uso de RAM)"
     )
     
+    parser.add_argument(
+        "--chunked",
+        action="store_true",
+        help="Pipeline completo por bloques de --chunk-size filas (memoria acotada por bloque)"
+    )
+    
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Procesar solo las filas nuevas del CSV (por huella de contenido) y agregarlas a la salida"
+    )
+    
+    parser.add_argument(
+        "--format",
+        choices=["parquet", "csv"],
+        default="parquet",
+        help="Formato del dataset procesado (parquet: columnar, recomendado para la API)"
+    )
+    
+    parser.add_argument(
+        "--arrow-text",
+        action="store_true",
+        help="Guardar el texto de las reseñas en buffers Arrow (menos memoria que objetos str)"
+    )
+    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Procesos para limpieza (países, reseñas) y sentimiento en paralelo (1 = en serie)"
+    )
+    
+    parser.add_argument(
+        "--dedup-columns",
+        type=lambda value: [c.strip() for c in value.split(",") if c.strip()],
+        default=None,
+        help="Columnas (separadas por coma) que definen un duplicado; por defecto, todas"
+    )
+    
+    parser.add_argument(
+        "--dedup-bits",
+        type=int,
+        choices=list(FINGERPRINT_BITS),
+        default=64,
+        help="Tamaño de la huella de fila para deduplicar (64 o 128 bits)"
+    )
+    
+    parser.add_argument(
+        "--dedup-spill",
+        action="store_true",
+        help="Guardar las huellas vistas en SQLite en disco (--chunked/--incremental)"
+    )
+    
+    parser.add_argument(
+        "--near-duplicates",
+        choices=["flag", "drop"],
+        default=None,
+        help="Detectar reseñas casi duplicadas (MinHash/LSH): marcarlas (flag) o eliminarlas (drop)"
+    )
+    
+    parser.add_argument(
+        "--near-dup-threshold",
+        type=float,
+        default=0.8,
+        help="Similitud de Jaccard mínima entre reseñas casi duplicadas (0-1)"
+    )
+    
+    parser.add_argument(
+        "--low-memory",
+        action="store_true",
+        help="Limpieza sin copias intermedias y liberación temprana de datos (menor pico de RAM)"
+    )
+    
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="No usar ni guardar checkpoints por fase ni caches de países/sentimiento (data/.cache)"
+    )
+    
     parser.add_argument(
         "--topics",
         action="store_true",
@@ -75,82 +168,300 @@ def parse_arguments():
         help="Saltar análisis de sentimientos (solo limpieza)"
     )
     
-    return parser.parse_args()
+    args = parser.parse_args()
+    
+    if args.chunked and args.sample > 0:
+        parser.error("--sample requiere el dataset completo en memoria; no es compatible con --chunked")
+    
+    if args.incremental and args.sample > 0:
+        parser.error("--sample no es compatible con --incremental")
+    
+    if args.workers < 1:
+        parser.error("--workers debe ser al menos 1")
+    
+    if args.near_duplicates and (args.chunked or args.incremental):
+        parser.error("--near-duplicates compara todas las reseñas; no es compatible con --chunked ni --incremental")
+    
+    if not 0 < args.near_dup_threshold <= 1:
+        parser.error("--near-dup-threshold debe estar entre 0 y 1")
+    
+    return args
 
 
-def main():
-    
-    # Función principal que ejecuta el pipeline completo.
+def run_chunked(args, data_out: Path, sentiment_cache: SentimentCache | None = None):
     
-    args = parse_arguments()
+    # Ejecuta carga → limpieza → sentimiento → escritura como etapas generadoras
+    # encadenadas: en memoria solo vive el bloque en curso.
+    # Con --incremental solo pasan las filas crudas que no están en el manifiesto
+    # y se agregan a la salida existente.
     
-    print("\n" + "="*70)
-    print("ANÁLISIS DE SENTIMIENTOS - RESEÑAS DE HOTELES")
-    print("="*70 + "\n")
+    counter = {}
     
-    # CARGA DE DATOS
-    print("FASE 1: CARGA DE DATOS")
+    print("FASE 1-3: CARGA, LIMPIEZA Y SENTIMIENTO POR BLOQUES")
     print("-" * 70)
     
-    df = load_dataset(DATA_IN)
+    # Solo se agrega si la salida y su manifiesto existen; si no, se procesa todo
+    append = args.incremental and data_out.exists() and manifest_path_for(data_out).exists()
+    seen = read_manifest(data_out) if append else set()
     
-    # Usar muestra si se especifica
-    if args.sample > 0:
-        df = get_sample(df, args.sample)
+    # Huellas de filas limpias: en incremental se conservan entre corridas
+    dedup_path = dedup_path_for(data_out, spill=args.dedup_spill)
+    if not append:
+        for path in (dedup_path_for(data_out), dedup_path_for(data_out, spill=True)):
+            path.unlink(missing_ok=True)
+    if args.dedup_spill:
+        seen_rows = SeenRows(args.dedup_bits, spill_path=dedup_path)
+    else:
+        seen_rows = SeenRows.load(dedup_path, args.dedup_bits)
     
-    get_data_summary(df)
+    if args.incremental:
+        print(f"Modo incremental: {len(seen):,} filas ya procesadas en el manifiesto")
+        chunks = load_dataset_chunks(DATA_IN, chunk_size=args.chunk_size)
+        chunks = count_rows(chunks, counter, "leidas")
+        chunks = skip_seen_rows(chunks, seen)
+        chunks = count_rows(chunks, counter, "nuevas")
+        chunks = compact_chunks(chunks)
+    else:
+        chunks = load_dataset_chunks(DATA_IN, chunk_size=args.chunk_size, compact=True)
+        chunks = count_rows(chunks, counter, "leidas")
     
-    # LIMPIEZA DE DATOS
-    print("FASE 2: LIMPIEZA DE DATOS")
-    print("-" * 70)
+    chunks = clean_chunks(
+        chunks, country_column='Reviewer_Nationality', arrow_text=args.arrow_text,
+        country_cache=None if args.no_cache else COUNTRY_CACHE, workers=args.workers,
+        seen=seen_rows, dedup_columns=args.dedup_columns
+    )
     
-    # Validar tipos de datos
-    df = validate_data_types(df)
+    if not args.skip_sentiment:
+        chunks = sentiment_iter(chunks, workers=args.workers, cache=sentiment_cache)
     
-    # Manejar valores faltantes
-    df = handle_missing_values(df)
+    if not append:
+        data_out.unlink(missing_ok=True)
+        manifest_path_for(data_out).unlink(missing_ok=True)
     
-    # Eliminar duplicados
-    df = remove_duplicates(df)
+    rows = write_chunks(chunks, data_out, append=append)
     
-    # Estandarizar nombres de países
-    df = standardize_countries(df, country_column='Reviewer_Nationality')
+    print(f"\nDuplicados eliminados: {seen_rows.duplicates:,} "
+          f"(huellas de {seen_rows.bits} bits, {len(seen_rows):,} filas únicas registradas)")
+    if args.incremental:
+        seen_rows.save(dedup_path)
+    seen_rows.close()
     
-    # Limpiar y combinar reseñas
-    df = clean_and_compose_reviews(df)
+    if args.incremental:
+        write_manifest(data_out, seen)
+        print(f"\nFilas leídas: {counter['leidas']:,} | Nuevas: {counter['nuevas']:,} | Filas agregadas: {rows:,}")
+        print(f"Manifiesto actualizado: {manifest_path_for(data_out)} ({len(seen):,} filas)")
+    else:
+        print(f"\nFilas leídas: {counter['leidas']:,} | Filas escritas: {rows:,}")
+    print(f"Resultados guardados (por bloques) en: {data_out}\n")
     
-    # Procesar texto (crear columna review_text)
-    df = clean_dataframe_reviews(df)
+    if not args.skip_sentiment:
+        show_sentiment_distribution(load_dataset(data_out, columns=["sentiment_label"], processed=True))
     
+    # FASE 4: MODELADO DE TÓPICOS (lee solo los segmentos de texto del archivo de salida)
+    if args.topics:
+        print("FASE 4: MODELADO DE TÓPICOS")
+        print("-" * 70)
+        
+        df_text = load_dataset(
+            data_out, columns=["Positive_Review", "Negative_Review"],
+            arrow_text=args.arrow_text, processed=True
+        )
+        topics = extract_topics(
+            add_review_text(df_text),
+            n_topics=args.n_topics,
+            text_column="review_text"
+        )
+        print_topics(topics)
+    
+    return rows
+
+
+def write_tags(data_out: Path):
+    
+    # Parsea una sola vez la columna Tags de la salida (vocabulario + matriz
+    # multi-hot + noches) para que la API filtre por etiqueta sin buscar texto.
+    # Se lee por lotes (row groups / bloques CSV): la memoria no depende del archivo.
+    
+    print(f"Indexando etiquetas desde: {data_out}")
+    write_tag_matrix(read_column_batches(data_out, "Tags"), data_out)
     print()
+
+
+def print_summary(data_out: Path, rows: int):
+    
+    # Resumen final del pipeline, con la memoria pico del proceso.
+    
+    print("="*70)
+    print("PIPELINE COMPLETADO EXITOSAMENTE")
+    print("="*70)
+    print(f"Archivo de salida: {data_out}")
+    print(f"Registros procesados: {rows:,}")
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"Memoria pico (RSS): {peak:,.1f} MB")
+    print("="*70 + "\n")
+
+
+def main():
+    
+    # Función principal que ejecuta el pipeline completo.
+    
+    args = parse_arguments()
+    data_out = DATA_OUT if args.format == "parquet" else DATA_OUT_CSV
+    
+    print("\n" + "="*70)
+    print("ANÁLISIS DE SENTIMIENTOS - RESEÑAS DE HOTELES")
+    print("="*70 + "\n")
+    
+    # Puntajes VADER ya calculados (en corridas anteriores) por hash del texto
+    sentiment_cache = None
+    if not args.no_cache and not args.skip_sentiment:
+        sentiment_cache = SentimentCache(SENTIMENT_CACHE)
+    
+    if args.chunked or args.incremental:
+        rows = run_chunked(args, data_out, sentiment_cache)
+        write_tags(data_out)
+        print_summary(data_out, rows)
+        return
+    
+    # Una corrida completa reemplaza la salida: el manifiesto incremental ya no aplica
+    manifest_path_for(data_out).unlink(missing_ok=True)
+    for path in (dedup_path_for(data_out), dedup_path_for(data_out, spill=True)):
+        path.unlink(missing_ok=True)
+    
+    # Checkpoints por fase: clave = hash del CSV + argumentos + versión del código.
+    # Se retoma desde el checkpoint válido más profundo.
+    store = None
+    if not args.no_cache:
+        store = CheckpointStore(CACHE_DIR)
+        clean_key = stage_key(
+            file_digest(DATA_IN), code_stamp(), "limpieza", args.sample, args.arrow_text,
+            args.dedup_columns, args.dedup_bits, args.near_duplicates, args.near_dup_threshold
+        )
+        sentiment_key = stage_key(clean_key, "sentimiento")
+        topics_key = stage_key(clean_key if args.skip_sentiment else sentiment_key, "topicos", args.n_topics)
+    
+    df, df_processed = None, None
+    if store is not None:
+        if not args.skip_sentiment and not args.stream:
+            df_processed = store.load_frame("sentimiento", sentiment_key)
+        if df_processed is None:
+            df = store.load_frame("limpieza", clean_key)
+    
+    if df is None and df_processed is None:
+        # CARGA DE DATOS
+        print("FASE 1: CARGA DE DATOS")
+        print("-" * 70)
+        
+        df = load_dataset(DATA_IN, compact=True)
+        
+        # Usar muestra si se especifica
+        if args.sample > 0:
+            df = get_sample(df, args.sample)
+        
+        get_data_summary(df)
+        
+        # LIMPIEZA DE DATOS
+        print("FASE 2: LIMPIEZA DE DATOS")
+        print("-" * 70)
+        
+        # Con --low-memory cada paso modifica df en lugar de copiarlo
+        inplace = args.low_memory
+        
+        # Validar tipos de datos
+        df = validate_data_types(df, inplace=inplace)
+        
+        # Manejar valores faltantes
+        df = handle_missing_values(df, inplace=inplace)
+        
+        # Eliminar duplicados
+        df = remove_duplicates(
+            df, subset=args.dedup_columns, bits=args.dedup_bits, inplace=inplace
+        )
+        
+        country_cache = None if args.no_cache else COUNTRY_CACHE
+        if args.workers > 1:
+            # Países y reseñas por particiones de filas en un pool de procesos
+            df = parallel_clean(
+                df, args.workers, country_column='Reviewer_Nationality', country_cache=country_cache
+            )
+        else:
+            # Estandarizar nombres de países
+            df = standardize_countries(
+                df, country_column='Reviewer_Nationality',
+                cache_path=country_cache, inplace=inplace
+            )
+            
+            # Limpiar reseñas (una pasada) y crear la columna review_text
+            df = clean_reviews(df, inplace=inplace)
+        
+        # Casi duplicados sobre el texto combinado (opcional)
+        if args.near_duplicates:
+            df = mark_near_duplicates(
+                df, text_column='review_text',
+                threshold=args.near_dup_threshold, action=args.near_duplicates
+            )
+        
+        # Texto limpio en buffers Arrow (opcional)
+        if args.arrow_text:
+            df = arrow_text(df)
+        
+        if store is not None:
+            store.save_frame("limpieza", clean_key, df)
+        
+        print()
+    else:
+        print("FASE 1-2: CARGA Y LIMPIEZA (desde checkpoint)\n")
+    
+    rows = len(df if df is not None else df_processed)
     
     # ANÁLISIS DE SENTIMIENTOS
     if not args.skip_sentiment:
         print("FASE 3: ANÁLISIS DE SENTIMIENTOS")
         print("-" * 70)
         
-        if args.stream:
+        if df_processed is not None:
+            # Resultado recuperado del checkpoint: solo se muestra y guarda
+            show_sentiment_distribution(df_processed)
+            save_processed_data(df_processed, data_out)
+            print()
+        elif args.stream:
             # Modo streaming: escribe directamente al archivo
-            if DATA_OUT.exists():
-                DATA_OUT.unlink()
+            if data_out.exists():
+                data_out.unlink()
+            
+            sentiment_chunked(
+                df, chunk_size=args.chunk_size, stream_path=data_out,
+                workers=args.workers, cache=sentiment_cache
+            )
+            print(f"Resultados guardados (streaming) en: {data_out}\n")
             
-            sentiment_chunked(df, chunk_size=args.chunk_size, stream_path=DATA_OUT)
-            print(f"Resultados guardados (streaming) en: {DATA_OUT}\n")
+            if args.low_memory:
+                df = None  # el texto limpio ya no se necesita
             
             # Cargar para análisis adicional si es necesario
             if args.topics:
-                df_processed = load_dataset(DATA_OUT)
+                df_processed = load_dataset(data_out, arrow_text=args.arrow_text, processed=True)
             else:
                 df_processed = None
         else:
             # Modo en memoria: procesa todo y guarda al final
-            df_processed = sentiment_chunked(df, chunk_size=args.chunk_size, stream_path=None)
+            df_processed = sentiment_chunked(
+                df, chunk_size=args.chunk_size, stream_path=None,
+                workers=args.workers, cache=sentiment_cache
+            )
+            
+            if args.low_memory:
+                df = None  # liberar el texto limpio antes de guardar
+            
+            if store is not None:
+                store.save_frame("sentimiento", sentiment_key, df_processed)
             
             # Mostrar distribución de sentimientos
             show_sentiment_distribution(df_processed)
             
             # Guardar resultados
-            save_processed_data(df_processed, DATA_OUT)
+            save_processed_data(df_processed, data_out)
             print()
     else:
         print("FASE 3: ANÁLISIS DE SENTIMIENTOS (OMITIDO)")
@@ -158,7 +469,7 @@ def main():
         df_processed = df
         
         # Guardar datos limpios aunque se omita el análisis de sentimientos
-        save_processed_data(df_processed, DATA_OUT)
+        save_processed_data(df_processed, data_out)
         print()
     
     # FASE 4: MODELADO DE TÓPICOS
@@ -166,31 +477,34 @@ def main():
         print("FASE 4: MODELADO DE TÓPICOS")
         print("-" * 70)
         
-        # Usar datos procesados si están disponibles
-        df_for_topics = df_processed if df_processed is not None else df
+        topics = store.load_json("topicos", topics_key) if store is not None else None
         
-        # Asegurar que existe la columna de texto
-        if "review_text" not in df_for_topics.columns:
-            print("No se encuentra columna 'review_text'. Creándola...")
-            df_for_topics = clean_dataframe_reviews(df_for_topics)
-        
-        # Extraer tópicos
-        topics = extract_topics(
-            df_for_topics,
-            n_topics=args.n_topics,
-            text_column="review_text"
-        )
+        if topics is None:
+            # Usar datos procesados si están disponibles
+            df_for_topics = df_processed if df_processed is not None else df
+            
+            # review_text no se guarda en la salida: se deriva de los segmentos
+            if "review_text" not in df_for_topics.columns:
+                df_for_topics = add_review_text(df_for_topics)
+            
+            # Extraer tópicos
+            topics = extract_topics(
+                df_for_topics,
+                n_topics=args.n_topics,
+                text_column="review_text"
+            )
+            
+            if store is not None:
+                store.save_json("topicos", topics_key, topics)
         
         # Mostrar resultados
         print_topics(topics)
     
+    # Índice de etiquetas alineado con la salida
+    write_tags(data_out)
+    
     # RESUMEN FINAL
-    print("="*70)
-    print("PIPELINE COMPLETADO EXITOSAMENTE")
-    print("="*70)
-    print(f"Archivo de salida: {DATA_OUT}")
-    print(f"Registros procesados: {len(df):,}")
-    print("="*70 + "\n")
+    print_summary(data_out, rows)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import pandas as pd
+from pathlib import Path
+
+# ============================================================
+# Checkpoints por fase direccionados por contenido
+# ============================================================
+
+# Módulos cuyo código define el resultado de las fases: si cambian, la
+# versión del código cambia y los checkpoints anteriores dejan de ser válidos
+PIPELINE_MODULES = [
+    "data_processing.py", "data_cleaning.py", "text_processing.py",
+    "sentiment_analysis.py", "topic_modeling.py", "dtype_optimization.py",
+    "processed_store.py", "checkpoints.py", "chunked_pipeline.py", "row_dedup.py",
+    "near_duplicates.py", "sentiment_cache.py"
+]
+
+# Punto de entrada (junto a scripts/): sus fases y argumentos también definen el resultado
+PIPELINE_ENTRY = "main.py"
+
+# Checkpoints que se conservan por fase (los más recientes)
+CHECKPOINTS_PER_STAGE = 2
+
+
+def file_digest(path: str | Path, block_size: int = 1 << 20) -> str:
+    """Hash (blake2b) del contenido de un archivo, leído por bloques."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_stamp(scripts_dir: str | Path = Path(__file__).resolve().parent) -> str:
+    """Versión del código: hash de las fuentes de los módulos del pipeline y de main.py."""
+    digest = hashlib.blake2b(digest_size=16)
+    scripts_dir = Path(scripts_dir)
+    paths = [(name, scripts_dir / name) for name in PIPELINE_MODULES]
+    paths.append((PIPELINE_ENTRY, scripts_dir.parent / PIPELINE_ENTRY))
+    for name, path in paths:
+        if path.exists():
+            digest.update(name.encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def stage_key(*parts) -> str:
+    """Clave de una fase a partir de sus entradas (hashes, argumentos, clave previa)."""
+    payload = json.dumps(parts, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(payload, digest_size=12).hexdigest()
+
+
+class CheckpointStore:
+    """
+    Guarda el resultado de cada fase en cache_dir como <fase>-<clave>.parquet
+    (DataFrames, conservando dtypes e índice) o .json (p. ej. tópicos).
+    """
+
+    def __init__(self, cache_dir: str | Path, keep: int = CHECKPOINTS_PER_STAGE):
+        self.cache_dir = Path(cache_dir)
+        self.keep = keep
+
+    def _path(self, stage: str, key: str, suffix: str) -> Path:
+        return self.cache_dir / f"{stage}-{key}{suffix}"
+
+    def _save(self, path: Path, write) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+        # Conservar solo los checkpoints más recientes de la fase
+        stage = path.name.split("-", 1)[0]
+        old = sorted(
+            (p for p in self.cache_dir.glob(f"{stage}-*{path.suffix}") if p != path),
+            key=lambda p: p.stat().st_mtime, reverse=True
+        )
+        for p in old[self.keep - 1:]:
+            p.unlink(missing_ok=True)
+
+    def load_frame(self, stage: str, key: str) -> pd.DataFrame | None:
+        path = self._path(stage, key, ".parquet")
+        if not path.exists():
+            return None
+        print(f"Checkpoint '{stage}' encontrado: {path.name}")
+        return pd.read_parquet(path)
+
+    def save_frame(self, stage: str, key: str, df: pd.DataFrame) -> None:
+        path = self._path(stage, key, ".parquet")
+        self._save(path, lambda p: df.to_parquet(p, compression="zstd"))
+        print(f"Checkpoint '{stage}' guardado: {path.name}")
+
+    def load_json(self, stage: str, key: str):
+        path = self._path(stage, key, ".json")
+        if not path.exists():
+            return None
+        print(f"Checkpoint '{stage}' encontrado: {path.name}")
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def save_json(self, stage: str, key: str, value) -> None:
+        path = self._path(stage, key, ".json")
+        self._save(path, lambda p: p.write_text(json.dumps(value, ensure_ascii=False), encoding="utf-8"))
+        print(f"Checkpoint '{stage}' guardado: {path.name}")
@@ -0,0 +1,150 @@
+import contextlib
+import io
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .data_cleaning import (
+        remove_duplicates,
+        handle_missing_values,
+        validate_data_types,
+        standardize_countries
+    )
+    from .text_processing import clean_reviews
+    from .dtype_optimization import arrow_text as to_arrow_text, optimize_dtypes
+    from .processed_store import row_fingerprints
+    from .row_dedup import SeenRows
+except ImportError:
+    from data_cleaning import (
+        remove_duplicates,
+        handle_missing_values,
+        validate_data_types,
+        standardize_countries
+    )
+    from text_processing import clean_reviews
+    from dtype_optimization import arrow_text as to_arrow_text, optimize_dtypes
+    from processed_store import row_fingerprints
+    from row_dedup import SeenRows
+
+# ============================================================
+# Limpieza en paralelo: etapas fila a fila en un pool de procesos
+# ============================================================
+
+
+def _clean_partition(part: pd.DataFrame, country_column: str, country_cache) -> pd.DataFrame:
+    """Países + reseñas sobre una partición (en un proceso del pool, sin salida por consola)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        part = standardize_countries(
+            part, country_column=country_column, cache_path=country_cache, inplace=True
+        )
+        return clean_reviews(part, inplace=True)
+
+
+def parallel_clean(df: pd.DataFrame, workers: int, country_column: str = "Reviewer_Nationality",
+                   country_cache=None, executor: ProcessPoolExecutor | None = None) -> pd.DataFrame:
+    """
+    Normaliza países y limpia/compone reseñas repartiendo df en particiones
+    contiguas de filas entre workers procesos. Las particiones se reúnen en el
+    orden original: el resultado es idéntico al de la corrida en serie.
+    Los duplicados deben eliminarse antes (necesitan ver todas las filas).
+    executor permite reutilizar un pool ya creado (p. ej. entre bloques).
+    """
+    if workers <= 1 or len(df) < 2:
+        df = standardize_countries(df, country_column=country_column, cache_path=country_cache)
+        return clean_reviews(df)
+
+    bounds = np.linspace(0, len(df), min(workers, len(df)) + 1).astype(int)
+    # copy(deep=False): particiones propias (no "vistas") que cada proceso modifica
+    parts = [df.iloc[start:end].copy(deep=False) for start, end in zip(bounds[:-1], bounds[1:])]
+
+    print(f"Normalizando países y limpiando reseñas en {len(parts)} procesos...")
+    before = df[country_column].nunique(dropna=True) if country_column in df.columns else None
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        cleaned = list(executor.map(
+            _clean_partition, parts,
+            [country_column] * len(parts), [country_cache] * len(parts)
+        ))
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    df = pd.concat(cleaned, ignore_index=True)
+    if before is not None:
+        after = df[country_column].nunique(dropna=True)
+        print(f"   Países únicos antes: {before} → después: {after} (consolidados: {before - after})")
+    return df
+
+
+# ============================================================
+# Pipeline por bloques: cada fase es una etapa generadora
+# ============================================================
+
+
+def clean_chunks(chunks, country_column: str = "Reviewer_Nationality", arrow_text: bool = False,
+                 country_cache=None, workers: int = 1, seen: SeenRows | None = None,
+                 dedup_columns: list | None = None):
+    """
+    Etapa de limpieza (FASE 2) sobre un iterador de bloques, en el mismo orden
+    que main.py: tipos → nulos → duplicados → países → reseñas → review_text.
+
+    Los duplicados se detectan también entre bloques con las huellas de fila
+    de seen (columnas dedup_columns o todas); pasar un SeenRows cargado de una
+    corrida anterior deduplica también entre corridas. Los bloques que quedan
+    vacíos no se emiten. Con
+    arrow_text=True el texto limpio de cada bloque pasa a buffers Arrow.
+    country_cache es el JSON de mapeos de países reutilizado entre corridas.
+    Con workers > 1, países y reseñas de cada bloque se procesan en un pool
+    de procesos compartido por todos los bloques (ver parallel_clean).
+    """
+    if seen is None:
+        seen = SeenRows()
+    with contextlib.ExitStack() as stack:
+        executor = None
+        if workers > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+        for i, chunk in enumerate(chunks, start=1):
+            print(f"-- Bloque {i}: {len(chunk):,} filas")
+            chunk = validate_data_types(chunk)
+            chunk = handle_missing_values(chunk)
+            chunk = remove_duplicates(chunk, subset=dedup_columns, seen=seen)
+            chunk = parallel_clean(
+                chunk, workers, country_column=country_column,
+                country_cache=country_cache, executor=executor
+            )
+            if arrow_text:
+                chunk = to_arrow_text(chunk, verbose=False)
+            if len(chunk):
+                yield chunk
+
+
+def skip_seen_rows(chunks, seen: set):
+    """
+    Etapa de ingesta incremental sobre bloques crudos: descarta las filas cuya
+    huella de contenido ya está en seen (procesadas en corridas anteriores o
+    repetidas en esta) y agrega a seen las huellas de las filas nuevas.
+    """
+    for chunk in chunks:
+        hashes = row_fingerprints(chunk)
+        is_new = np.fromiter((h not in seen for h in hashes), dtype=bool, count=len(hashes))
+        is_new &= ~pd.Series(hashes).duplicated().to_numpy()
+        seen.update(hashes[is_new].tolist())
+        yield chunk[is_new].reset_index(drop=True)
+
+
+def compact_chunks(chunks):
+    """Etapa de tipos compactos (categóricas, float32/int32) por bloque."""
+    for chunk in chunks:
+        yield optimize_dtypes(chunk, verbose=False)
+
+
+def count_rows(chunks, counter: dict, key: str):
+    """Etapa de paso que acumula en counter[key] las filas que la atraviesan."""
+    counter.setdefault(key, 0)
+    for chunk in chunks:
+        counter[key] += len(chunk)
+        yield chunk
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# ============================================================
+# Texto comprimido por bloques (zstd) con descompresión bajo demanda
+# ============================================================
+
+# Filas por bloque: una página de /reviews/filter toca pocos bloques
+TEXT_BLOCK_SIZE = 4096
+TEXT_BLOCK_COMPRESSION = "zstd"
+
+
+class CompressedTextColumn:
+    """
+    Columna de texto guardada como bloques de TEXT_BLOCK_SIZE filas, cada uno
+    serializado en Arrow IPC con compresión zstd. take() descomprime solo los
+    bloques que contienen las posiciones pedidas, de a uno por vez.
+    """
+
+    def __init__(self, name: str, blocks: list, length: int, block_size: int):
+        self.name = name
+        self.blocks = blocks
+        self.length = length
+        self.block_size = block_size
+
+    @classmethod
+    def from_series(cls, series: pd.Series, block_size: int = TEXT_BLOCK_SIZE) -> "CompressedTextColumn":
+        """Comprime la columna (object o Arrow) bloque a bloque."""
+        if isinstance(series.array, pd.arrays.ArrowExtensionArray):
+            values = pa.array(series.array).cast(pa.string())
+            # Columnas mapeadas desde IPC llegan en varios chunks (uno por batch)
+            if isinstance(values, pa.ChunkedArray):
+                values = values.combine_chunks()
+        else:
+            values = pa.array(series.to_numpy(dtype=object), type=pa.string(), from_pandas=True)
+
+        schema = pa.schema([(str(series.name), pa.string())])
+        options = pa.ipc.IpcWriteOptions(compression=TEXT_BLOCK_COMPRESSION)
+
+        blocks = []
+        for start in range(0, len(values), block_size):
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, schema, options=options) as writer:
+                writer.write_batch(pa.record_batch([values.slice(start, block_size)], schema=schema))
+            blocks.append(sink.getvalue())
+
+        return cls(series.name, blocks, len(values), block_size)
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes comprimidos en memoria."""
+        return sum(block.size for block in self.blocks)
+
+    def _block(self, block_id: int) -> pa.Array:
+        return pa.ipc.open_stream(self.blocks[block_id]).read_all().column(0).combine_chunks()
+
+    def take(self, positions) -> pd.Series:
+        """Textos en las posiciones pedidas (en ese orden) como pd.ArrowDtype(string)."""
+        positions = np.asarray(positions, dtype=np.int64)
+        if len(positions) == 0:
+            values = pa.array([], type=pa.string())
+            return pd.Series(pd.arrays.ArrowExtensionArray(values), name=self.name)
+
+        block_ids = positions // self.block_size
+        order = np.argsort(block_ids, kind="stable")
+        sorted_ids = block_ids[order]
+        bounds = np.flatnonzero(np.diff(sorted_ids)) + 1
+
+        # Un bloque descomprimido a la vez: solo se conservan las filas tomadas
+        pieces = []
+        for group in np.split(order, bounds):
+            block_id = block_ids[group[0]]
+            local = positions[group] - block_id * self.block_size
+            pieces.append(self._block(block_id).take(pa.array(local)))
+
+        inverse = np.empty_like(order)
+        inverse[order] = np.arange(len(order))
+        values = pa.concat_arrays(pieces).take(pa.array(inverse))
+        return pd.Series(pd.arrays.ArrowExtensionArray(values), name=self.name)
@@ -1,6 +1,20 @@
+import hashlib
+import json
+import os
 import re
 import unicodedata
+import numpy as np
 import pandas as pd
+from pathlib import Path
+
+try:
+    from .dtype_optimization import as_str, fill_category
+    from .text_processing import clean_reviews
+    from .row_dedup import SeenRows, fingerprints
+except ImportError:
+    from dtype_optimization import as_str, fill_category
+    from text_processing import clean_reviews
+    from row_dedup import SeenRows, fingerprints
 
 # ============================================================
 # 0) Utilidades para normalizar países (ISO-like, estricto)
@@ -129,18 +143,98 @@ def canonical_country(raw: str):
     # 6) Nada encaja → None (se filtra)
     return None
 
-def standardize_countries_strict(df: pd.DataFrame, col: str = "Reviewer_Nationality") -> pd.DataFrame:
+# ============================================================
+# Caché de normalización de países (valor crudo → canónico)
+# ============================================================
+
+# Las reglas viven en este archivo: si cambia, la caché persistida se descarta
+_RULES_STAMP = hashlib.blake2b(Path(__file__).read_bytes(), digest_size=8).hexdigest()
+
+# Mapeos por modo ("strict"/"legacy"), compartidos entre bloques de una corrida
+_country_cache = {"strict": {}, "legacy": {}}
+_loaded_cache_paths = set()
+_stale_cache_paths = set()  # rutas sin caché válida: se escriben aunque no haya valores nuevos
+
+
+def _load_country_cache(cache_path: Path) -> None:
+    """Incorpora (una vez por ruta) los mapeos guardados en corridas anteriores."""
+    if cache_path in _loaded_cache_paths:
+        return
+    _loaded_cache_paths.add(cache_path)
+    try:
+        data = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        data = {}
+    if data.get("rules") != _RULES_STAMP:
+        _stale_cache_paths.add(cache_path)
+        return
+    for mode, mapping in data.get("mappings", {}).items():
+        _country_cache.setdefault(mode, {}).update(mapping)
+
+
+def _save_country_cache(cache_path: Path) -> None:
+    """Escribe la caché completa de forma atómica (archivo temporal + replace)."""
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    payload = {"rules": _RULES_STAMP, "mappings": _country_cache}
+    tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, cache_path)
+    _stale_cache_paths.discard(cache_path)
+
+
+def map_unique_countries(series: pd.Series, func, mode: str = "strict",
+                         cache_path: str | Path | None = None) -> pd.Series:
+    """
+    Aplica func (valor crudo → país) una vez por valor distinto y lo propaga a
+    todas las filas. Los resultados se guardan en la caché del modo y, con
+    cache_path, se persisten en JSON para las siguientes corridas.
+    Devuelve una columna object con el índice de la original.
+    """
+    cache = _country_cache.setdefault(mode, {})
+    if cache_path is not None:
+        cache_path = Path(cache_path)
+        _load_country_cache(cache_path)
+
+    # Los nulos también son un valor distinto (func decide su resultado)
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+
+    mapped = np.empty(len(uniques), dtype=object)
+    new_values = False
+    for i, raw in enumerate(np.asarray(uniques, dtype=object)):
+        if isinstance(raw, str) and raw in cache:
+            mapped[i] = cache[raw]
+            continue
+        mapped[i] = func(raw)
+        if isinstance(raw, str):
+            cache[raw] = mapped[i]
+            new_values = True
+
+    if cache_path is not None and (new_values or cache_path in _stale_cache_paths):
+        _save_country_cache(cache_path)
+
+    return pd.Series(mapped.take(codes), index=series.index, name=series.name, dtype=object)
+
+
+def standardize_countries_strict(df: pd.DataFrame, col: str = "Reviewer_Nationality",
+                                 cache_path: str | Path | None = None,
+                                 inplace: bool = False) -> pd.DataFrame:
     """
     Normaliza países con reglas estrictas (ISO-like) + filtra no-países.
+    canonical_country se evalúa una vez por valor distinto (ver map_unique_countries).
+    Con inplace=True modifica df (el llamador cede el DataFrame).
     """
     if col not in df.columns:
         print(f"[WARN] Columna '{col}' no existe; skip.")
         return df
     print("Normalizando países (estricto ISO + territorios → país)…")
     before = df[col].nunique(dropna=True)
-    df = df.copy()
-    df[col] = df[col].apply(canonical_country)
-    df = df[~df[col].isna()].reset_index(drop=True)  # filtra None
+    if not inplace:
+        df = df.copy(deep=False)  # solo se reemplazan columnas: no hace falta copiar datos
+    df[col] = map_unique_countries(df[col], canonical_country, "strict", cache_path)
+    keep = df[col].notna().to_numpy()
+    if not keep.all():
+        df = df.take(np.flatnonzero(keep))  # filtra None (DataFrame nuevo, no una vista)
+    df.reset_index(drop=True, inplace=True)
     after = df[col].nunique(dropna=True)
     print(f"   Únicos antes: {before} → después: {after} (consolidados: {before - after})")
     return df
@@ -171,49 +265,51 @@ def clean_text(text: str) -> str:
     return text.strip()
 
 
-def clean_and_compose_reviews(df):
+def clean_and_compose_reviews(df, inplace: bool = False):
     """
     Limpia y combina las columnas Positive_Review y Negative_Review del dataframe.
     
     Args:
         df: DataFrame con columnas de reseñas
+        inplace: Modificar df en lugar de devolver uno nuevo
         
     Returns:
         DataFrame con columnas limpias y Combined_Review
     """
-    df = df.copy()
-    
-    # Limpiar columnas
-    print("Iniciando limpieza de texto en las reseñas...")
-    for col in ['Positive_Review', 'Negative_Review']:
-        if col in df.columns:
-            df[col] = df[col].apply(clean_text)
-    
-    # Combinar reseñas
-    print("Combinando reseñas positivas y negativas para crear 'Combined_Review'...")
-    df['Combined_Review'] = df.apply(
-        lambda row: f"{row['Positive_Review']}. {row['Negative_Review']}".strip(". "),
-        axis=1
-    )
-    
+    df = clean_reviews(df, combined_columns=("Combined_Review",), inplace=inplace)
     print("Limpieza completada")
     return df
 
 
-def remove_duplicates(df: pd.DataFrame, subset=None) -> pd.DataFrame:
+def remove_duplicates(df: pd.DataFrame, subset=None, seen: SeenRows | None = None,
+                      inplace: bool = False, bits: int = 64) -> pd.DataFrame:
     """
-    Elimina filas duplicadas del DataFrame.
+    Elimina filas duplicadas del DataFrame comparando huellas compactas de
+    fila (hash de 64/128 bits de las columnas de subset) en lugar de los
+    valores completos, textos incluidos. Se conserva la primera aparición.
     
     Args:
         df: DataFrame original
         subset: Lista de columnas para considerar duplicados (None = todas)
+        seen: Huellas de filas ya conservadas en bloques o corridas anteriores
+              (modo por bloques). Se actualiza con las filas conservadas.
+        inplace: El llamador cede df (sin copias si no hay duplicados)
+        bits: Tamaño de la huella si no se pasa seen (64 o 128)
         
     Returns:
         DataFrame sin duplicados
     """
-    original_count = len(df)
-    df_clean = df.drop_duplicates(subset=subset, keep='first').reset_index(drop=True)
-    removed = original_count - len(df_clean)
+    if seen is None:
+        seen = SeenRows(bits)
+    keep = seen.add(fingerprints(df, subset, bits=seen.bits))
+    
+    if keep.all():
+        df_clean = df if inplace else df.copy(deep=False)
+    else:
+        df_clean = df.take(np.flatnonzero(keep))
+    df_clean.reset_index(drop=True, inplace=True)
+    
+    removed = len(df) - len(df_clean)
     
     if removed > 0:
         print(f"Eliminados {removed:,} registros duplicados")
@@ -223,7 +319,8 @@ def remove_duplicates(df: pd.DataFrame, subset=None) -> pd.DataFrame:
     return df_clean
 
 
-def handle_missing_values(df: pd.DataFrame, strategy: dict = None) -> pd.DataFrame:
+def handle_missing_values(df: pd.DataFrame, strategy: dict = None,
+                          inplace: bool = False) -> pd.DataFrame:
     """
     Maneja valores faltantes según estrategia especificada.
     
@@ -231,11 +328,13 @@ def handle_missing_values(df: pd.DataFrame, strategy: dict = None) -> pd.DataFra
         df: DataFrame original
         strategy: Diccionario con estrategias por columna
                  Ej: {'columna': 'drop', 'otra': 'fill', 'valor': 0}
+        inplace: Rellenar sobre df (el llamador cede el DataFrame)
         
     Returns:
         DataFrame con valores faltantes manejados
     """
-    df_clean = df.copy()
+    # Solo se reemplazan columnas completas: basta una copia superficial
+    df_clean = df if inplace else df.copy(deep=False)
     
     # Contar valores nulos iniciales
     null_counts = df_clean.isnull().sum()
@@ -253,26 +352,28 @@ def handle_missing_values(df: pd.DataFrame, strategy: dict = None) -> pd.DataFra
     if strategy is None:
         # Rellenar con valores por defecto según tipo
         for col in has_nulls.index:
-            if df_clean[col].dtype in ['float64', 'int64']:
-                df_clean[col].fillna(0, inplace=True)
+            if pd.api.types.is_float_dtype(df_clean[col]) or pd.api.types.is_integer_dtype(df_clean[col]):
+                df_clean[col] = df_clean[col].fillna(0)
             else:
-                df_clean[col].fillna("", inplace=True)
+                df_clean[col] = fill_category(df_clean[col], "")
         print("Valores faltantes rellenados con valores por defecto")
     
     return df_clean
 
 
-def validate_data_types(df: pd.DataFrame) -> pd.DataFrame:
+def validate_data_types(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
     """
     Valida y convierte tipos de datos según sea necesario.
     
     Args:
         df: DataFrame a validar
+        inplace: Convertir sobre df (el llamador cede el DataFrame)
         
     Returns:
         DataFrame con tipos de datos validados
     """
-    df_clean = df.copy()
+    # Solo se reemplazan columnas completas: basta una copia superficial
+    df_clean = df if inplace else df.copy(deep=False)
     
     print("Validando tipos de datos...")
     
@@ -282,7 +383,7 @@ def validate_data_types(df: pd.DataFrame) -> pd.DataFrame:
     
     for col in text_cols:
         if col in df_clean.columns:
-            df_clean[col] = df_clean[col].astype(str)
+            df_clean[col] = as_str(df_clean[col])
     
     # Asegurar que las columnas numéricas sean numeric
     numeric_cols = ['Average_Score', 'Reviewer_Score']
@@ -379,36 +480,42 @@ def get_country_mapping() -> dict:
 
 
 def standardize_countries(df: pd.DataFrame, country_column: str = 'Reviewer_Nationality',
-                          strict: bool = True) -> pd.DataFrame:
+                          strict: bool = True, cache_path: str | Path | None = None,
+                          inplace: bool = False) -> pd.DataFrame:
     """
     API de compatibilidad:
       - strict=True  -> usa el normalizador ISO-like (recomendado)
       - strict=False -> usa el mapeo básico legacy (tu función original)
+    En ambos modos el mapeo se calcula por valor distinto; cache_path (JSON)
+    lo conserva entre corridas. Con inplace=True modifica df.
     """
     if not strict:
         # ---- Legacy: implementación original (Matías Mosquera), con mejoras mínimas(FQ)----
         if country_column not in df.columns:
             print(f"Advertencia: Columna '{country_column}' no encontrada")
             return df
-        df_clean = df.copy()
+        df_clean = df if inplace else df.copy(deep=False)
         print(f"Estandarizando nombres de países en '{country_column}' (LEGACY)...")
         unique_before = df_clean[country_column].nunique()
-        df_clean[country_column] = df_clean[country_column].astype(str).str.strip()
 
         country_map = get_country_mapping()
+        # Búsqueda sin mayúsculas en O(1); ante claves repetidas gana la primera del mapeo
+        country_map_lower = {}
+        for key, value in country_map.items():
+            country_map_lower.setdefault(key.lower(), value)
 
         def map_country(country):
-            if pd.isna(country) or country == '':
+            country = str(country).strip()
+            if country == '':
                 return country
             if country in country_map:
                 return country_map[country]
-            country_lower = country.lower()
-            for key, value in country_map.items():
-                if key.lower() == country_lower:
-                    return value
-            return country.strip()
+            return country_map_lower.get(country.lower(), country)
 
-        df_clean[country_column] = df_clean[country_column].apply(map_country)
+        # as_str conserva las categóricas (None → "None", NaN → "nan" como antes)
+        df_clean[country_column] = map_unique_countries(
+            as_str(df_clean[country_column]), map_country, "legacy", cache_path
+        )
         unique_after = df_clean[country_column].nunique()
         print(f"   Países únicos antes: {unique_before}")
         print(f"   Países únicos después: {unique_after}")
@@ -417,7 +524,7 @@ def standardize_countries(df: pd.DataFrame, country_column: str = 'Reviewer_Nati
     
 
     # ---- Estricto (recomendado) ----
-    return standardize_countries_strict(df, col=country_column)
+    return standardize_countries_strict(df, col=country_column, cache_path=cache_path, inplace=inplace)
 
 def country_consolidation_report(df: pd.DataFrame, col: str = "Reviewer_Nationality") -> tuple[pd.DataFrame, pd.DataFrame]:
     """
@@ -430,7 +537,7 @@ def country_consolidation_report(df: pd.DataFrame, col: str = "Reviewer_National
 
     tmp = df[[col]].copy()
     tmp["__original__"] = tmp[col].astype(str)
-    tmp["__canonical__"] = tmp["__original__"].apply(canonical_country)
+    tmp["__canonical__"] = map_unique_countries(tmp["__original__"], canonical_country)
 
     # Alias que sí consolidaron en un país válido
     kept = tmp[~tmp["__canonical__"].isna()].copy()
@@ -467,13 +574,16 @@ def country_consolidation_report(df: pd.DataFrame, col: str = "Reviewer_National
 
 def apply_full_cleaning(df: pd.DataFrame,
                         country_col: str = "Reviewer_Nationality",
-                        strict_countries: bool = True) -> pd.DataFrame:
+                        strict_countries: bool = True,
+                        inplace: bool = False) -> pd.DataFrame:
     """
     Pipeline recomendado: tipos → nulos → duplicados → reseñas → países (estricto).
+    Con inplace=True cada paso trabaja sobre el DataFrame recibido, sin copias
+    intermedias: el llamador cede df y debe usar solo el resultado.
     """
-    df = validate_data_types(df)
-    df = handle_missing_values(df)
-    df = remove_duplicates(df)
-    df = clean_and_compose_reviews(df)
-    df = standardize_countries(df, country_column=country_col, strict=strict_countries)
+    df = validate_data_types(df, inplace=inplace)
+    df = handle_missing_values(df, inplace=inplace)
+    df = remove_duplicates(df, inplace=inplace)
+    df = clean_and_compose_reviews(df, inplace=inplace)
+    df = standardize_countries(df, country_column=country_col, strict=strict_countries, inplace=inplace)
     return df
\ No newline at end of file
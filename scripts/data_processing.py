@@ -1,10 +1,41 @@
+import itertools
 import pandas as pd
 from pathlib import Path
 
+try:
+    from .processed_store import (
+        PROCESSED_COLUMNS, DERIVED_TEXT_COLUMNS, PROCESSED_CSV_NA, HotelDimension,
+        is_parquet_path, read_processed, write_parquet, write_hotels
+    )
+    from .dtype_optimization import CATEGORY_COLUMNS, optimize_dtypes, arrow_text as to_arrow_text
+except ImportError:
+    from processed_store import (
+        PROCESSED_COLUMNS, DERIVED_TEXT_COLUMNS, PROCESSED_CSV_NA, HotelDimension,
+        is_parquet_path, read_processed, write_parquet, write_hotels
+    )
+    from dtype_optimization import CATEGORY_COLUMNS, optimize_dtypes, arrow_text as to_arrow_text
 
-def load_dataset(file_path: str | Path, encoding: str = "utf-8") -> pd.DataFrame:
+
+def csv_dtypes(compact: bool) -> dict | None:
+    
+    # Con compact=True las dimensiones se leen del CSV directamente como
+    # categóricas: no se materializa la columna de objetos str completa.
     
-    # Carga el dataset de reseñas de hoteles.
+    return {col: "category" for col in CATEGORY_COLUMNS} if compact else None
+
+
+def load_dataset(file_path: str | Path,
+                 encoding: str = "utf-8",
+                 columns: list | None = None,
+                 compact: bool = False,
+                 arrow_text: bool = False,
+                 processed: bool = False) -> pd.DataFrame:
+    
+    # Carga el dataset de reseñas de hoteles (opcionalmente solo algunas columnas).
+    # Con compact=True aplica tipos compactos (categóricas, float32/int32).
+    # Con arrow_text=True el texto queda en buffers Arrow en lugar de objetos str.
+    # Con processed=True el archivo es la salida del pipeline: en CSV el texto
+    # limpio ("None", "NA", "nan"...) se lee tal cual y solo el campo vacío es nulo.
 
     file_path = Path(file_path)
     
@@ -13,14 +44,57 @@ def load_dataset(file_path: str | Path, encoding: str = "utf-8") -> pd.DataFrame
     
     print(f"Cargando datos desde: {file_path}")
     
+    if is_parquet_path(file_path):
+        df = read_processed(file_path, columns=columns, arrow_text=arrow_text)
+    else:
+        dtype = csv_dtypes(compact)
+        na_options = PROCESSED_CSV_NA if processed else {}
+        try:
+            df = pd.read_csv(file_path, encoding=encoding, usecols=columns, dtype=dtype, **na_options)
+        except UnicodeDecodeError:
+            print("Error de codificación UTF-8, intentando con latin-1...")
+            df = pd.read_csv(file_path, encoding="latin-1", usecols=columns, dtype=dtype, **na_options)
+    
+    print(f"Datos cargados: {df.shape[0]:,} filas, {df.shape[1]} columnas")
+    
+    if compact:
+        df = optimize_dtypes(df)
+    
+    if arrow_text:
+        df = to_arrow_text(df)
+    
+    return df
+
+
+def load_dataset_chunks(file_path: str | Path,
+                        chunk_size: int = 100_000,
+                        encoding: str = "utf-8",
+                        compact: bool = False):
+    
+    # Lee el dataset por bloques (generador): la memoria depende de chunk_size, no del archivo.
+    
+    file_path = Path(file_path)
+    
+    if not file_path.exists():
+        raise FileNotFoundError(f"No se encuentra el archivo: {file_path}")
+    
+    print(f"Leyendo datos por bloques de {chunk_size:,} filas desde: {file_path}")
+    
+    # La codificación se detecta con el primer bloque
+    dtype = csv_dtypes(compact)
     try:
-        df = pd.read_csv(file_path, encoding=encoding)
+        reader = pd.read_csv(file_path, encoding=encoding, chunksize=chunk_size, dtype=dtype)
+        first = next(reader, None)
     except UnicodeDecodeError:
         print("Error de codificación UTF-8, intentando con latin-1...")
-        df = pd.read_csv(file_path, encoding="latin-1")
+        reader = pd.read_csv(file_path, encoding="latin-1", chunksize=chunk_size, dtype=dtype)
+        first = next(reader, None)
     
-    print(f"Datos cargados: {df.shape[0]:,} filas, {df.shape[1]} columnas")
-    return df
+    if first is None:
+        return
+    
+    for chunk in itertools.chain([first], reader):
+        yield optimize_dtypes(chunk, verbose=False) if compact else chunk
 
 
 def get_sample(df: pd.DataFrame, n: int, random_state: int = 42) -> pd.DataFrame:
@@ -37,14 +111,26 @@ def save_processed_data(df: pd.DataFrame,
                        output_path: str | Path,
                        encoding: str = "utf-8") -> None:
     
-    # Guarda el DataFrame procesado en un archivo CSV.
+    # Guarda el DataFrame procesado en Parquet (.parquet) o CSV (resto de extensiones).
+    # El texto combinado (review_text, Combined_Review) no se guarda: se deriva al leer.
+    # Los atributos de hotel van a una dimensión aparte (<salida>_hotels) y las
+    # reseñas solo llevan hotel_id.
     
+    hotels = HotelDimension()
+    df = hotels.split(df.drop(columns=DERIVED_TEXT_COLUMNS, errors="ignore"))
     output_path = Path(output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
     
     print(f"Guardando datos procesados en: {output_path}")
-    df.to_csv(output_path, index=False, encoding=encoding)
+    if is_parquet_path(output_path):
+        write_parquet(df, output_path)
+    else:
+        df.to_csv(output_path, index=False, encoding=encoding)
     print(f"Archivo guardado exitosamente ({len(df):,} filas)")
+    
+    hotels_path = write_hotels(hotels, output_path, encoding=encoding)
+    if hotels_path is not None:
+        print(f"Dimensión de hoteles guardada en: {hotels_path} ({len(hotels):,} hoteles)")
 
 
 def show_sentiment_distribution(df: pd.DataFrame, 
@@ -97,15 +183,7 @@ def prepare_output_columns(df: pd.DataFrame) -> pd.DataFrame:
     
     # Prepara las columnas de salida del DataFrame procesado.
     
-    # Columnas deseadas en orden
-    cols_order = [
-        "Hotel_Name", "Hotel_Address", "Reviewer_Nationality",
-        "Positive_Review", "Negative_Review", "review_text",
-        "compound", "pos", "neu", "neg", "sentiment_label",
-        "Average_Score", "Reviewer_Score", "Tags", "lat", "lng"
-    ]
-    
-    # Seleccionar solo las columnas que existen
-    cols_available = [c for c in cols_order if c in df.columns]
+    # Seleccionar solo las columnas que existen (en el orden del almacén)
+    cols_available = [c for c in PROCESSED_COLUMNS if c in df.columns]
     
     return df[cols_available].copy()
@@ -0,0 +1,222 @@
+import sys
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# ============================================================
+# Tipos compactos: categóricas para dimensiones y float32/int32 para medidas
+# ============================================================
+
+# Dimensiones de baja cardinalidad (hoteles, países, etiquetas, fechas)
+CATEGORY_COLUMNS = [
+    "Hotel_Name", "Hotel_Address", "Reviewer_Nationality", "sentiment_label",
+    "Review_Date", "days_since_review"
+]
+
+# Medidas con pocas cifras significativas: float32 sin pérdida al volver a
+# float64 por su representación decimal más corta (ver widen_float32).
+# lat/lng se mantienen en float64 (hasta 10 cifras significativas).
+FLOAT32_COLUMNS = ["Average_Score", "Reviewer_Score", "compound", "pos", "neu", "neg"]
+
+# Conteos enteros del dataset crudo
+INT32_COLUMNS = [
+    "Additional_Number_of_Scoring", "Review_Total_Negative_Word_Counts",
+    "Total_Number_of_Reviews", "Review_Total_Positive_Word_Counts",
+    "Total_Number_of_Reviews_Reviewer_Has_Given"
+]
+
+
+# Texto de reseñas: buffers Arrow contiguos en lugar de objetos str de Python
+TEXT_COLUMNS = ["Positive_Review", "Negative_Review", "review_text", "Combined_Review", "Tags"]
+
+ARROW_STRING = pd.ArrowDtype(pa.string())
+
+
+def memory_mb(df: pd.DataFrame) -> float:
+    """Memoria total del DataFrame (deep) en MB."""
+    return df.memory_usage(deep=True).sum() / 1024**2
+
+
+def peak_rss_mb() -> float | None:
+    """Memoria residente pico del proceso en MB (None si no hay módulo resource, p. ej. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB; macOS, bytes
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def optimize_dtypes(df: pd.DataFrame,
+                    category_columns: list = CATEGORY_COLUMNS,
+                    float32_columns: list = FLOAT32_COLUMNS,
+                    int32_columns: list = INT32_COLUMNS,
+                    verbose: bool = True) -> pd.DataFrame:
+    """
+    Convierte dimensiones a categóricas (con categorías ordenadas
+    alfabéticamente) y reduce medidas numéricas a float32/int32.
+    Las columnas ausentes se ignoran. No modifica el DataFrame original.
+    """
+    before = memory_mb(df) if verbose else None
+    df = df.copy(deep=False)
+
+    for col in category_columns:
+        if col not in df.columns:
+            continue
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            categories = df[col].cat.categories
+            if not categories.is_monotonic_increasing:
+                df[col] = df[col].cat.reorder_categories(sorted(categories))
+        else:
+            df[col] = df[col].astype("category")
+
+    for col in float32_columns:
+        if col in df.columns and pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].astype(np.float32)
+
+    for col in int32_columns:
+        if col in df.columns and pd.api.types.is_integer_dtype(df[col]):
+            col_min, col_max = df[col].min(), df[col].max()
+            if np.iinfo(np.int32).min <= col_min and col_max <= np.iinfo(np.int32).max:
+                df[col] = df[col].astype(np.int32)
+
+    if verbose:
+        after = memory_mb(df)
+        saved = (1 - after / before) * 100 if before else 0.0
+        print(f"Tipos compactos: memoria {before:,.2f} MB → {after:,.2f} MB (-{saved:.1f}%)")
+
+    return df
+
+
+def widen_float32(series: pd.Series) -> pd.Series:
+    """
+    Devuelve la columna en float64 recuperando el decimal original: cada valor
+    float32 se expande por su representación decimal más corta (8.8 → 8.8 y no
+    8.800000190734863). Se calcula sobre los valores únicos.
+    """
+    if series.dtype != np.float32:
+        return series
+    codes, uniques = pd.factorize(series.to_numpy())
+    wide = np.asarray(uniques).astype(str).astype(np.float64)
+    values = np.where(codes < 0, np.nan, wide.take(np.maximum(codes, 0)) if len(wide) else np.nan)
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def widen_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Aplica widen_float32 a todas las columnas float32 del DataFrame."""
+    float32_cols = [c for c in df.columns if df[c].dtype == np.float32]
+    if not float32_cols:
+        return df
+    df = df.copy(deep=False)
+    for col in float32_cols:
+        df[col] = widen_float32(df[col])
+    return df
+
+
+def value_counts_observed(series: pd.Series) -> pd.Series:
+    """
+    value_counts que, para categóricas, cuenta sobre los códigos enteros y
+    omite categorías sin filas. Resultado (orden y empates) igual al de
+    value_counts sobre la columna de strings equivalente.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.value_counts()
+
+    codes = series.cat.codes.to_numpy()
+    codes = codes[codes >= 0]
+    order = pd.unique(codes)  # orden de primera aparición, como el hashtable de pandas
+    counts = np.bincount(codes, minlength=len(series.cat.categories))[order]
+
+    result = pd.Series(counts, index=series.cat.categories[order], name="count")
+    result.index.name = series.name
+    return result.sort_values(ascending=False)
+
+
+def fill_category(series: pd.Series, value) -> pd.Series:
+    """fillna que también funciona en categóricas (agrega la categoría si falta)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        if not series.isna().any():
+            return series
+        if value not in series.cat.categories:
+            series = series.cat.add_categories([value])
+    return series.fillna(value)
+
+
+def as_str(series: pd.Series) -> pd.Series:
+    """
+    Equivalente a series.astype(str) que conserva las categóricas: las
+    categorías pasan a str y los nulos a la categoría "nan".
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(str)
+    if series.cat.categories.dtype != object:
+        series = series.cat.rename_categories(series.cat.categories.astype(str))
+    return fill_category(series, "nan")
+
+
+# ============================================================
+# Texto en buffers Arrow
+# ============================================================
+
+def is_arrow_string(series: pd.Series) -> bool:
+    """True si la columna es texto respaldado por Arrow (ArrowDtype o string[pyarrow])."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.ArrowDtype):
+        return pa.types.is_string(dtype.pyarrow_dtype) or pa.types.is_large_string(dtype.pyarrow_dtype)
+    return isinstance(dtype, pd.StringDtype) and dtype.storage == "pyarrow"
+
+
+def arrow_text(df: pd.DataFrame, text_columns: list = TEXT_COLUMNS, verbose: bool = True) -> pd.DataFrame:
+    """
+    Pasa las columnas de texto a buffers Arrow contiguos (pd.ArrowDtype(string)):
+    sin ~50 bytes de cabecera por objeto str. No modifica el DataFrame original.
+    """
+    before = memory_mb(df) if verbose else None
+    df = df.copy(deep=False)
+
+    for col in text_columns:
+        if col in df.columns and not is_arrow_string(df[col]):
+            df[col] = df[col].astype(ARROW_STRING)
+
+    if verbose:
+        print(f"Texto en Arrow: memoria {before:,.2f} MB → {memory_mb(df):,.2f} MB")
+
+    return df
+
+
+def join_text(series: pd.Series, sep: str = " ") -> str:
+    """
+    Une los textos no nulos de la columna con sep. Para texto Arrow la unión se
+    hace en C++ sobre los buffers; para object, con str.join.
+    """
+    if not is_arrow_string(series):
+        return sep.join(series.dropna().astype(str).tolist())
+
+    values = pc.drop_null(pa.array(series.array))
+    if isinstance(values, pa.ChunkedArray):
+        values = values.combine_chunks()
+    if len(values) == 0:
+        return ""
+    lists = pa.ListArray.from_arrays(pa.array([0, len(values)], pa.int32()), values)
+    return pc.binary_join(lists, sep)[0].as_py()
+
+
+def frame_to_records(df: pd.DataFrame) -> list:
+    """
+    Equivalente a df.to_dict('records') que convierte cada columna en bloque
+    (to_pylist para Arrow, tolist para numpy/categóricas) en vez de celda a celda.
+    Los nulos de las columnas Arrow salen como None (serializables a JSON).
+    """
+    columns = []
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.array, pd.arrays.ArrowExtensionArray):
+            columns.append(pa.array(series.array).to_pylist())  # nulos → None
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            columns.append(series.astype(object).tolist())
+        else:
+            columns.append(series.tolist())
+    names = list(df.columns)
+    return [dict(zip(names, row)) for row in zip(*columns)]
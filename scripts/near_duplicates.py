@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from sklearn.feature_extraction.text import HashingVectorizer
+
+# ============================================================
+# Casi duplicados: firmas MinHash + LSH por bandas
+# ============================================================
+
+NEAR_DUPLICATE_COLUMN = "near_duplicate"
+
+# Primo (< 2^32) para las permutaciones h(x) = (a·x + b) mod p: a·x + b cabe en uint64
+_MINHASH_PRIME = np.uint64(4_294_967_291)
+_MAX_SHINGLE = 2**31 - 1  # n_features máximo de HashingVectorizer
+
+# Filas por bloque al calcular firmas: acota la matriz num_perm × shingles del bloque
+_SIGNATURE_BLOCK = 1024
+
+
+def _shingles(texts, shingle_size: int):
+    """Matriz dispersa fila × shingle (n-gramas de palabras en minúsculas, hasheados)."""
+    vectorizer = HashingVectorizer(
+        analyzer="word", ngram_range=(shingle_size, shingle_size), token_pattern=r"(?u)\b\w+\b",
+        lowercase=True, n_features=_MAX_SHINGLE, alternate_sign=False, norm=None, binary=True
+    )
+    return vectorizer.transform(texts).tocsr()
+
+
+def lsh_params(threshold: float, num_perm: int, false_positive_weight: float = 0.1) -> tuple:
+    """
+    Bandas y filas por banda (b, r con b·r ≤ num_perm) que minimizan el error
+    ponderado de la curva 1 - (1 - s^r)^b alrededor del umbral de Jaccard.
+    Los falsos positivos pesan poco: cada candidato se verifica con la firma,
+    así que solo cuestan tiempo; un falso negativo es un duplicado perdido.
+    """
+    below = np.linspace(0.0, threshold, 200)
+    above = np.linspace(threshold, 1.0, 200)
+    best, best_error = (1, num_perm), np.inf
+    for r in range(1, num_perm + 1):
+        b = num_perm // r
+        false_pos = np.trapezoid(1 - (1 - below**r) ** b, below)
+        false_neg = np.trapezoid((1 - above**r) ** b, above)
+        error = false_positive_weight * false_pos + (1 - false_positive_weight) * false_neg
+        if error < best_error:
+            best, best_error = (b, r), error
+    return best
+
+
+def minhash_signatures(texts, num_perm: int = 128, shingle_size: int = 3,
+                       seed: int = 42) -> tuple:
+    """
+    Firma MinHash (num_perm valores uint32) de cada texto. Devuelve también
+    el número de shingles distintos por texto (0 → sin firma útil).
+    Se calcula por bloques de filas con operaciones vectorizadas.
+    """
+    shingles = _shingles(texts, shingle_size)
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _MINHASH_PRIME, size=num_perm, dtype=np.uint64)[:, None]
+    b = rng.integers(0, _MINHASH_PRIME, size=num_perm, dtype=np.uint64)[:, None]
+
+    n = shingles.shape[0]
+    counts = np.diff(shingles.indptr)
+    signatures = np.full((n, num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+
+    for start in range(0, n, _SIGNATURE_BLOCK):
+        block = shingles[start:start + _SIGNATURE_BLOCK]
+        rows = np.flatnonzero(np.diff(block.indptr))
+        if len(rows) == 0:
+            continue
+        hashed = (a * block.indices.astype(np.uint64) + b) % _MINHASH_PRIME
+        # Mínimo por fila sobre sus shingles (solo filas con al menos uno)
+        mins = np.minimum.reduceat(hashed, block.indptr[rows], axis=1)
+        signatures[start + rows] = mins.T.astype(np.uint32)
+
+    return signatures, counts
+
+
+def near_duplicate_of(texts, threshold: float = 0.8, num_perm: int = 128,
+                      shingle_size: int = 3, min_shingles: int = 5) -> np.ndarray:
+    """
+    Para cada texto, la posición del primer texto de su grupo de casi
+    duplicados (similitud de Jaccard estimada ≥ threshold), o -1 si no tiene.
+
+    Candidatos por LSH: en cada banda las filas se ordenan por cubeta y cada
+    fila se compara con la siguiente de su misma cubeta (O(n·bandas), sin pares
+    cuadráticos); el par se acepta si la fracción de valores MinHash iguales
+    alcanza el umbral. Los grupos son las componentes conexas de los pares
+    aceptados: un miembro de la cubeta que no es duplicado solo corta la
+    cadena en su posición, no aísla al resto. Los textos con menos de
+    min_shingles shingles distintos (p. ej. "Nothing") no se agrupan.
+    """
+    signatures, counts = minhash_signatures(texts, num_perm=num_perm, shingle_size=shingle_size)
+    n = len(signatures)
+    valid = np.flatnonzero(counts >= min_shingles)
+    bands, rows_per_band = lsh_params(threshold, num_perm)
+
+    sources, targets = [], []
+    for band in range(bands):
+        cols = signatures[valid, band * rows_per_band:(band + 1) * rows_per_band]
+        keys = np.ascontiguousarray(cols).view(np.dtype((np.void, cols.dtype.itemsize * rows_per_band))).ravel()
+        bucket = np.unique(keys, return_inverse=True)[1].ravel()
+        # Miembros consecutivos de cada cubeta (en orden de fila)
+        order = np.argsort(bucket, kind="stable")
+        same = bucket[order[1:]] == bucket[order[:-1]]
+        sources.append(valid[order[:-1][same]])
+        targets.append(valid[order[1:][same]])
+
+    sources = np.concatenate(sources) if sources else np.empty(0, dtype=np.int64)
+    targets = np.concatenate(targets) if targets else np.empty(0, dtype=np.int64)
+    if len(sources):
+        pairs = np.unique(np.stack([sources, targets], axis=1), axis=0)
+        sources, targets = pairs[:, 0], pairs[:, 1]
+        similarity = (signatures[sources] == signatures[targets]).mean(axis=1)
+        accepted = similarity >= threshold
+        sources, targets = sources[accepted], targets[accepted]
+
+    result = np.full(n, -1, dtype=np.int64)
+    if len(sources) == 0:
+        return result
+
+    graph = coo_matrix((np.ones(len(sources), dtype=np.int8), (sources, targets)), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+
+    # Representante de cada grupo: su primera fila
+    first_of_label = np.full(labels.max() + 1, n, dtype=np.int64)
+    np.minimum.at(first_of_label, labels, np.arange(n))
+    result = first_of_label[labels]
+    result[result == np.arange(n)] = -1
+    return result
+
+
+def mark_near_duplicates(df: pd.DataFrame, text_column: str = "review_text",
+                         threshold: float = 0.8, action: str = "flag",
+                         num_perm: int = 128, shingle_size: int = 3,
+                         min_shingles: int = 5) -> pd.DataFrame:
+    """
+    Detecta casi duplicados en text_column. action="flag" agrega la columna
+    booleana near_duplicate (True en todas las filas de un grupo salvo la
+    primera); action="drop" elimina esas filas. No modifica el DataFrame original.
+    """
+    if action not in ("flag", "drop"):
+        raise ValueError("action debe ser 'flag' o 'drop'")
+
+    print(f"Buscando casi duplicados en '{text_column}' (MinHash/LSH, umbral {threshold})...")
+    texts = df[text_column].fillna("").astype(str).tolist()
+    near_of = near_duplicate_of(
+        texts, threshold=threshold, num_perm=num_perm,
+        shingle_size=shingle_size, min_shingles=min_shingles
+    )
+    is_near = near_of >= 0
+    print(f"   Casi duplicados: {int(is_near.sum()):,} filas en {len(np.unique(near_of[is_near])):,} grupos")
+
+    if action == "drop":
+        if not is_near.any():
+            return df.copy(deep=False)
+        return df.take(np.flatnonzero(~is_near)).reset_index(drop=True)
+
+    df = df.copy(deep=False)
+    df[NEAR_DUPLICATE_COLUMN] = is_near
+    return df
@@ -0,0 +1,535 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+
+try:
+    from .dtype_optimization import ARROW_STRING, widen_frame
+except ImportError:
+    from dtype_optimization import ARROW_STRING, widen_frame
+
+# ============================================================
+# Almacén columnar (Parquet) del dataset procesado
+# ============================================================
+
+# Columnas de salida del pipeline, en orden. review_text no se guarda: se deriva
+# de Positive_Review/Negative_Review al leer (text_processing.add_review_text)
+PROCESSED_COLUMNS = [
+    "Hotel_Name", "Hotel_Address", "Reviewer_Nationality",
+    "Positive_Review", "Negative_Review",
+    "compound", "pos", "neu", "neg", "sentiment_label",
+    "Average_Score", "Reviewer_Score", "Tags", "lat", "lng",
+    "near_duplicate"  # solo con main.py --near-duplicates flag
+]
+
+# Atributos por hotel: se guardan una vez por hotel en la dimensión de hoteles
+# (<salida>_hotels.parquet) y las reseñas solo llevan hotel_id
+HOTEL_ID = "hotel_id"
+HOTEL_COLUMNS = ["Hotel_Name", "Hotel_Address", "Average_Score", "lat", "lng"]
+
+# Identidad del hotel: el resto de atributos (puntaje, coordenadas) puede cambiar
+HOTEL_KEY_COLUMNS = ["Hotel_Name", "Hotel_Address"]
+
+# Destino del hotel (derivado de Hotel_Address): solo en la dimensión de hoteles
+HOTEL_LOCATION_COLUMNS = ["Hotel_City", "Hotel_Country"]
+
+# Países de varias palabras al final de la dirección (el resto ocupan una)
+_MULTIWORD_COUNTRIES = ("United Kingdom", "United States", "Czech Republic", "New Zealand", "South Africa")
+
+# Texto combinado derivable de los segmentos: nunca se escribe en la salida
+DERIVED_TEXT_COLUMNS = ["review_text", "Combined_Review"]
+
+# Al releer un CSV escrito por el pipeline: el único nulo es el campo vacío.
+# "None", "NA", "nan"... en los segmentos limpios son texto de la reseña
+PROCESSED_CSV_NA = {"keep_default_na": False, "na_values": [""]}
+
+# Columnas de baja cardinalidad → dictionary-encoded (hotel, nacionalidad, etiqueta)
+_DICT = pa.dictionary(pa.int32(), pa.string())
+
+PROCESSED_SCHEMA = pa.schema([
+    ("hotel_id", pa.int32()),
+    ("Hotel_Name", _DICT),
+    ("Hotel_Address", _DICT),
+    ("Reviewer_Nationality", _DICT),
+    ("Positive_Review", pa.string()),
+    ("Negative_Review", pa.string()),
+    ("compound", pa.float64()),
+    ("pos", pa.float64()),
+    ("neu", pa.float64()),
+    ("neg", pa.float64()),
+    ("sentiment_label", _DICT),
+    ("Average_Score", pa.float64()),
+    ("Reviewer_Score", pa.float64()),
+    ("Tags", pa.string()),
+    ("lat", pa.float64()),
+    ("lng", pa.float64()),
+    ("near_duplicate", pa.bool_()),
+    ("Hotel_City", _DICT),
+    ("Hotel_Country", _DICT),
+])
+
+# ~4 row groups para el dataset completo (≈512K filas): la API decodifica en paralelo
+PARQUET_ROW_GROUP_SIZE = 128_000
+PARQUET_COMPRESSION = "zstd"
+
+
+def is_parquet_path(path: str | Path) -> bool:
+    """True si la ruta apunta a un archivo Parquet (por extensión)."""
+    return Path(path).suffix.lower() in (".parquet", ".pq")
+
+
+def schema_for(df: pd.DataFrame) -> pa.Schema:
+    """
+    Esquema explícito para las columnas del DataFrame: tipos fijos para las
+    columnas conocidas del pipeline, inferidos para el resto.
+    """
+    fields = []
+    for col in df.columns:
+        idx = PROCESSED_SCHEMA.get_field_index(col)
+        if idx >= 0:
+            field = PROCESSED_SCHEMA.field(idx)
+            # pd.cut produce categóricas ordenadas: respetar el flag
+            if isinstance(df[col].dtype, pd.CategoricalDtype) and df[col].cat.ordered:
+                field = field.with_type(pa.dictionary(pa.int32(), pa.string(), ordered=True))
+            fields.append(field)
+        else:
+            fields.append(pa.Schema.from_pandas(df[[col]], preserve_index=False).field(col))
+    return pa.schema(fields)
+
+
+def to_arrow_table(df: pd.DataFrame, schema: pa.Schema | None = None) -> pa.Table:
+    """Convierte el DataFrame a una tabla Arrow con el esquema del almacén."""
+    # Las medidas float32 en memoria se guardan como float64 con su valor decimal
+    df = widen_frame(df)
+    schema = schema or schema_for(df)
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def write_parquet(df: pd.DataFrame, output_path: str | Path) -> None:
+    """Escribe el DataFrame completo como Parquet con el esquema del almacén."""
+    pq.write_table(
+        to_arrow_table(df),
+        output_path,
+        row_group_size=PARQUET_ROW_GROUP_SIZE,
+        compression=PARQUET_COMPRESSION,
+    )
+
+
+class ParquetChunkWriter:
+    """
+    Escritor incremental: cada bloque se agrega como row group(s) del mismo
+    archivo. El esquema se fija con el primer bloque, salvo que se indique.
+    """
+
+    def __init__(self, output_path: str | Path, schema: pa.Schema | None = None):
+        self.output_path = Path(output_path)
+        self._writer = None
+        self._schema = schema
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if self._schema is None:
+            self._schema = schema_for(chunk)
+        self.write_table(to_arrow_table(chunk, self._schema))
+
+    def write_table(self, table: pa.Table) -> None:
+        if self._writer is None:
+            self._schema = self._schema or table.schema
+            self._writer = pq.ParquetWriter(
+                self.output_path, self._schema, compression=PARQUET_COMPRESSION
+            )
+        self._writer.write_table(table, row_group_size=PARQUET_ROW_GROUP_SIZE)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+# ============================================================
+# Dimensión de hoteles
+# ============================================================
+
+def hotels_path_for(path: str | Path) -> Path:
+    """Ruta de la dimensión de hoteles junto al archivo de reseñas (<nombre>_hotels.<ext>)."""
+    path = Path(path)
+    return path.with_name(f"{path.stem}_hotels{path.suffix}")
+
+
+class HotelDimension:
+    """
+    Asigna un hotel_id (en orden de aparición) a cada hotel distinto (nombre +
+    dirección). Average_Score, lat y lng son atributos del hotel: si cambian
+    se actualizan en su fila con el valor no nulo más reciente. Los ids se conservan
+    entre bloques, así se puede usar en el pipeline por bloques.
+    """
+
+    def __init__(self):
+        self._ids = {}   # hash de nombre + dirección → hotel_id
+        self._rows = []  # atributos de cada hotel_id
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @classmethod
+    def from_frame(cls, hotels: pd.DataFrame) -> "HotelDimension":
+        """Dimensión existente (p. ej. leída del disco): conserva sus hotel_id."""
+        dimension = cls()
+        hotels = hotels.sort_values(HOTEL_ID)
+        columns = [c for c in HOTEL_COLUMNS if c in hotels.columns]
+        keys = [c for c in HOTEL_KEY_COLUMNS if c in columns]
+        for h, (_, row) in zip(_attribute_hashes(hotels[keys]), hotels[columns].iterrows()):
+            dimension._ids[h] = len(dimension._rows)
+            dimension._rows.append(row.to_dict())
+        return dimension
+
+    def split(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Devuelve las reseñas con hotel_id en lugar de los atributos del hotel."""
+        columns = [c for c in HOTEL_COLUMNS if c in df.columns]
+        if "Hotel_Name" not in columns:
+            return df
+
+        attrs = widen_frame(df[columns])
+        hashes = _attribute_hashes(attrs[[c for c in HOTEL_KEY_COLUMNS if c in columns]])
+        uniques, first, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        # Atributos de cada hotel: el último valor no nulo del bloque
+        latest = attrs.groupby(inverse, sort=True, observed=True).last()
+
+        for k in np.argsort(first, kind="stable"):
+            row = {c: latest[c].iloc[k] for c in columns}
+            hotel_id = self._ids.get(uniques[k])
+            if hotel_id is None:
+                self._ids[uniques[k]] = len(self._rows)
+                self._rows.append(row)
+            else:
+                self._rows[hotel_id].update({c: v for c, v in row.items() if not pd.isna(v)})
+
+        ids = np.array([self._ids[h] for h in uniques], dtype=np.int32)[inverse]
+        facts = df.drop(columns=columns)
+        facts.insert(0, HOTEL_ID, ids)
+        return facts
+
+    def to_frame(self) -> pd.DataFrame:
+        """Tabla de hoteles: hotel_id + atributos (+ ciudad y país), una fila por hotel."""
+        hotels = pd.DataFrame(self._rows).infer_objects()
+        hotels.insert(0, HOTEL_ID, np.arange(len(hotels), dtype=np.int32))
+        if "Hotel_Address" in hotels.columns:
+            position = hotels.columns.get_loc("Hotel_Address") + 1
+            locations = hotel_locations(hotels["Hotel_Address"])
+            for offset, col in enumerate(HOTEL_LOCATION_COLUMNS):
+                hotels.insert(position + offset, col, locations[col])
+        return hotels
+
+
+def parse_hotel_address(address) -> tuple:
+    """
+    (ciudad, país) del final de una dirección, p. ej. "... 1092 AA Amsterdam
+    Netherlands" o "... London SE1 7UT United Kingdom": el país son las últimas
+    palabras y la ciudad la palabra anterior sin contar el código postal.
+    """
+    if not isinstance(address, str) or not address.strip():
+        return None, None
+    words = address.split()
+    country_words = 1
+    for country in _MULTIWORD_COUNTRIES:
+        if address.endswith(" " + country):
+            country_words = len(country.split())
+            break
+    country = " ".join(words[-country_words:])
+    rest = words[:-country_words]
+    # Código postal (tokens con dígitos, como "SE1 7UT") entre la ciudad y el país
+    while rest and any(ch.isdigit() for ch in rest[-1]):
+        rest.pop()
+    return (rest[-1] if rest else None), country
+
+
+def hotel_locations(addresses: pd.Series) -> pd.DataFrame:
+    """Ciudad y país (categóricas) de cada dirección, parseadas una vez por valor distinto."""
+    codes, uniques = pd.factorize(addresses, use_na_sentinel=True)
+    parsed = [parse_hotel_address(address) for address in uniques] + [(None, None)]
+    codes = np.where(codes < 0, len(uniques), codes)
+    return pd.DataFrame({
+        col: pd.Categorical([p[k] for p in parsed])[codes]
+        for k, col in enumerate(HOTEL_LOCATION_COLUMNS)
+    }, index=addresses.index)
+
+
+def _attribute_hashes(attrs: pd.DataFrame) -> np.ndarray:
+    """Hash por fila de las columnas de hotel, igual para categóricas y strings."""
+    attrs = attrs.copy(deep=False)
+    for col in attrs.columns:
+        if isinstance(attrs[col].dtype, pd.CategoricalDtype):
+            attrs[col] = attrs[col].astype(object)
+    return pd.util.hash_pandas_object(attrs, index=False).to_numpy()
+
+
+def read_hotels(output_path: str | Path) -> pd.DataFrame | None:
+    """Lee la dimensión de hoteles asociada al archivo de reseñas (None si no existe)."""
+    path = hotels_path_for(output_path)
+    if not path.exists():
+        return None
+    if is_parquet_path(path):
+        return pq.read_table(path).to_pandas()
+    return pd.read_csv(path, **PROCESSED_CSV_NA)
+
+
+def write_hotels(dimension: HotelDimension, output_path: str | Path, encoding: str = "utf-8") -> Path | None:
+    """Escribe la dimensión de hoteles junto al archivo de reseñas output_path."""
+    hotels = dimension.to_frame()
+    if hotels.empty:
+        return None
+
+    path = hotels_path_for(output_path)
+    if is_parquet_path(path):
+        write_parquet(hotels, path)
+    else:
+        hotels.to_csv(path, index=False, encoding=encoding)
+    return path
+
+
+def join_hotels(facts: pd.DataFrame, hotels: pd.DataFrame, columns: list | None = None) -> pd.DataFrame:
+    """
+    Reconstruye las columnas de hotel de cada reseña a partir de hotel_id
+    (hotel_id se indexa directamente en la dimensión) y quita hotel_id.
+    """
+    columns = [c for c in (columns or HOTEL_COLUMNS) if c in hotels.columns and c != HOTEL_ID]
+    ids = facts[HOTEL_ID].to_numpy()
+
+    df = facts.drop(columns=HOTEL_ID)
+    for col in columns:
+        df[col] = hotels[col].iloc[ids].reset_index(drop=True).set_axis(df.index)
+
+    order = [c for c in PROCESSED_COLUMNS if c in df.columns]
+    return df[order + [c for c in df.columns if c not in order]]
+
+
+def write_chunks(chunks,
+                 output_path: str | Path,
+                 encoding: str = "utf-8",
+                 append: bool = False) -> int:
+    """
+    Consume un iterador de DataFrames y los escribe uno a uno en el archivo de
+    salida (Parquet si la extensión lo indica, CSV si no), sin las columnas de
+    texto derivadas y con los atributos de hotel en la dimensión de hoteles.
+
+    Con append=True los bloques se agregan al almacén existente conservando
+    sus hotel_id: en CSV se anexan al archivo; en Parquet se reescribe a un
+    temporal (copiando los row groups existentes) que reemplaza al original.
+    Si no llega ningún bloque el almacén no se toca. Devuelve las filas escritas.
+    """
+    output_path = Path(output_path)
+    append = append and output_path.exists()
+    is_parquet = is_parquet_path(output_path)
+
+    if append:
+        existing_hotels = read_hotels(output_path)
+        if existing_hotels is None:
+            raise ValueError(f"No se encuentra la dimensión de hoteles de {output_path}; reprocesar completo")
+        hotels = HotelDimension.from_frame(existing_hotels)
+    else:
+        hotels = HotelDimension()
+
+    target = output_path.with_name(f"{output_path.name}.{os.getpid()}.tmp") if append and is_parquet else output_path
+    parquet_writer = None
+    rows = 0
+
+    try:
+        for chunk in chunks:
+            chunk = chunk.drop(columns=DERIVED_TEXT_COLUMNS, errors="ignore")
+            chunk = hotels.split(chunk)
+            if is_parquet:
+                if parquet_writer is None:
+                    parquet_writer = ParquetChunkWriter(
+                        target, schema=pq.read_schema(output_path) if append else None
+                    )
+                    if append:
+                        existing = pq.ParquetFile(output_path)
+                        for batch in existing.iter_batches(batch_size=PARQUET_ROW_GROUP_SIZE):
+                            parquet_writer.write_table(pa.Table.from_batches([batch]))
+                parquet_writer.write(chunk)
+            else:
+                chunk.to_csv(
+                    output_path,
+                    index=False,
+                    encoding=encoding,
+                    mode="a" if rows or append else "w",
+                    header=not (rows or append)
+                )
+            rows += len(chunk)
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
+
+    if append and is_parquet and parquet_writer is not None:
+        os.replace(target, output_path)
+
+    if rows or not append:
+        write_hotels(hotels, output_path, encoding=encoding)
+    return rows
+
+
+# ============================================================
+# Manifiesto de ingesta incremental: hashes de las filas crudas procesadas
+# ============================================================
+
+def manifest_path_for(path: str | Path) -> Path:
+    """Ruta del manifiesto junto al archivo de reseñas (<nombre>_manifest.parquet)."""
+    path = Path(path)
+    return path.with_name(f"{path.stem}_manifest.parquet")
+
+
+def row_fingerprints(df: pd.DataFrame) -> np.ndarray:
+    """Huella (uint64) del contenido de cada fila cruda."""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def read_manifest(output_path: str | Path) -> set:
+    """Huellas de las filas crudas ya procesadas (vacío si no hay manifiesto)."""
+    path = manifest_path_for(output_path)
+    if not path.exists():
+        return set()
+    return set(pq.read_table(path).column("row_hash").to_numpy().tolist())
+
+
+def write_manifest(output_path: str | Path, fingerprints) -> Path:
+    """Guarda el manifiesto completo (escritura atómica)."""
+    path = manifest_path_for(output_path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    table = pa.table({"row_hash": pa.array(np.fromiter(fingerprints, dtype=np.uint64), pa.uint64())})
+    pq.write_table(table, tmp_path, compression=PARQUET_COMPRESSION)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_processed(path: str | Path,
+                   columns: list | None = None,
+                   categorical: bool = True,
+                   arrow_text: bool = False) -> pd.DataFrame:
+    """
+    Lee el almacén Parquet leyendo solo las columnas pedidas (las que no
+    existan en el archivo se ignoran). Si el archivo trae hotel_id y existe
+    la dimensión de hoteles, las columnas de hotel se reconstruyen con ella
+    (Hotel_City y Hotel_Country solo si están en columns).
+
+    Con categorical=False las columnas dictionary-encoded se devuelven como
+    strings (object) en lugar de pd.Categorical. Con arrow_text=True las
+    columnas de texto quedan en buffers Arrow (pd.ArrowDtype) sin crear
+    objetos str de Python.
+    """
+    available = pq.read_schema(path).names
+    hotels_path = hotels_path_for(path)
+    hotel_columns = []
+    if HOTEL_ID in available and hotels_path.exists():
+        # Ciudad/país solo si se piden explícitamente
+        hotel_columns = [c for c in (columns or HOTEL_COLUMNS) if c in HOTEL_COLUMNS + HOTEL_LOCATION_COLUMNS]
+
+    if columns is not None:
+        columns = [c for c in columns if c in available]
+        if hotel_columns and HOTEL_ID not in columns:
+            columns.append(HOTEL_ID)
+
+    df = _table_to_pandas(pq.read_table(path, columns=columns), categorical, arrow_text)
+
+    if hotel_columns:
+        hotels = _table_to_pandas(pq.read_table(hotels_path), categorical, arrow_text)
+        df = join_hotels(df, hotels, hotel_columns)
+
+    return df
+
+
+def read_column_batches(path: str | Path, column: str, batch_size: int = PARQUET_ROW_GROUP_SIZE):
+    """
+    Generador de una columna del archivo procesado por lotes (Series): en
+    Parquet por lotes de row groups, en CSV por bloques de batch_size filas.
+    """
+    path = Path(path)
+    if is_parquet_path(path):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=[column]):
+            yield batch.column(0).to_pandas()
+    else:
+        reader = pd.read_csv(path, usecols=[column], chunksize=batch_size, **PROCESSED_CSV_NA)
+        for chunk in reader:
+            yield chunk[column]
+
+
+def _table_to_pandas(table: pa.Table, categorical: bool, arrow_text: bool) -> pd.DataFrame:
+    """Conversión a pandas con las opciones de read_processed."""
+
+    if not categorical:
+        for i, field in enumerate(table.schema):
+            if pa.types.is_dictionary(field.type):
+                table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+
+    if arrow_text:
+        return table.to_pandas(types_mapper={pa.string(): ARROW_STRING}.get)
+    return table.to_pandas()
+
+
+# ============================================================
+# Arrow IPC (Feather v2) mapeado en memoria, compartido entre workers
+# ============================================================
+
+def write_arrow_ipc(table: pa.Table, output_path: str | Path) -> None:
+    """
+    Escribe la tabla como archivo Arrow IPC sin compresión (requisito para
+    mmap sin copia). Se escribe a un temporal y se renombra de forma atómica,
+    así varios workers pueden generarlo a la vez sin leer un archivo a medias.
+    """
+    output_path = Path(output_path)
+    tmp_path = output_path.with_name(f"{output_path.name}.{os.getpid()}.tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=PARQUET_ROW_GROUP_SIZE)
+    os.replace(tmp_path, output_path)
+
+
+def ensure_arrow_ipc(parquet_path: str | Path,
+                     arrow_path: str | Path,
+                     columns: list | None = None) -> Path:
+    """
+    Genera (o regenera si está desactualizado) el archivo Arrow IPC a partir
+    del Parquet procesado. Devuelve la ruta del archivo IPC.
+    """
+    parquet_path, arrow_path = Path(parquet_path), Path(arrow_path)
+    if arrow_path.exists() and arrow_path.stat().st_mtime >= parquet_path.stat().st_mtime:
+        return arrow_path
+
+    if columns is not None:
+        available = set(pq.read_schema(parquet_path).names)
+        columns = [c for c in columns if c in available]
+    # Un Parquet escrito por bloques trae un diccionario por row group; IPC
+    # exige uno solo por columna
+    table = pq.read_table(parquet_path, columns=columns).unify_dictionaries()
+    write_arrow_ipc(table, arrow_path)
+    return arrow_path
+
+
+def read_arrow_mmap(path: str | Path,
+                    columns: list | None = None,
+                    categorical: bool = True) -> pd.DataFrame:
+    """
+    Abre el archivo Arrow IPC con memory-map de solo lectura.
+
+    Las columnas de texto quedan como pd.ArrowDtype apuntando directamente a
+    las páginas del archivo: todos los procesos que lo mapean comparten la
+    misma copia en el page cache. Numéricas y dictionary-encoded (pequeñas)
+    se convierten a numpy/Categorical privados del proceso.
+    """
+    source = pa.memory_map(str(path), "r")
+    table = pa.ipc.open_file(source).read_all()
+    if columns is not None:
+        table = table.select([c for c in columns if c in table.column_names])
+
+    data = {}
+    for name, col in zip(table.column_names, table.columns):
+        if pa.types.is_string(col.type) or pa.types.is_large_string(col.type):
+            data[name] = pd.Series(pd.arrays.ArrowExtensionArray(col), copy=False)
+        elif pa.types.is_dictionary(col.type):
+            series = col.to_pandas()
+            data[name] = series if categorical else series.astype(object)
+        else:
+            data[name] = col.to_pandas()
+
+    return pd.DataFrame(data, copy=False)
@@ -0,0 +1,179 @@
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+
+# ============================================================
+# Deduplicación por huellas compactas de fila (64/128 bits)
+# ============================================================
+
+FINGERPRINT_BITS = (64, 128)
+
+# Claves de hash (16 caracteres) de las dos mitades de una huella de 128 bits
+_HASH_KEY_HI = "0123456789123456"  # la clave por defecto de pandas
+_HASH_KEY_LO = "huellas-dedup-lo"
+
+# Huella de 128 bits como registro (hi, lo): se ordena y busca con numpy
+FINGERPRINT128 = np.dtype([("hi", "<u8"), ("lo", "<u8")])
+
+
+def fingerprints(df: pd.DataFrame, subset: list | None = None, bits: int = 64) -> np.ndarray:
+    """
+    Huella de cada fila (solo las columnas de subset, o todas): uint64 con
+    bits=64, o registros FINGERPRINT128 con bits=128. Las categóricas dan la
+    misma huella que el texto equivalente, así que sirven entre bloques.
+    """
+    if bits not in FINGERPRINT_BITS:
+        raise ValueError(f"bits debe ser uno de {FINGERPRINT_BITS}")
+    data = df if subset is None else df[list(subset)]
+    hi = pd.util.hash_pandas_object(data, index=False, hash_key=_HASH_KEY_HI).to_numpy()
+    if bits == 64:
+        return hi
+    result = np.empty(len(hi), dtype=FINGERPRINT128)
+    result["hi"] = hi
+    result["lo"] = pd.util.hash_pandas_object(data, index=False, hash_key=_HASH_KEY_LO).to_numpy()
+    return result
+
+
+def dedup_path_for(path: str | Path, spill: bool = False) -> Path:
+    """Ruta de las huellas vistas junto al archivo de reseñas (<nombre>_dedup.parquet/.sqlite)."""
+    path = Path(path)
+    return path.with_name(f"{path.stem}_dedup{'.sqlite' if spill else '.parquet'}")
+
+
+class SeenRows:
+    """
+    Conjunto de huellas de filas ya conservadas. En memoria se guarda como
+    arreglo numpy ordenado (8 o 16 bytes por fila, búsqueda con searchsorted);
+    con spill_path vive en una tabla SQLite en disco y la RAM no crece con el
+    número de filas. add() marca las filas nuevas y cuenta los duplicados.
+    """
+
+    def __init__(self, bits: int = 64, spill_path: str | Path | None = None):
+        if bits not in FINGERPRINT_BITS:
+            raise ValueError(f"bits debe ser uno de {FINGERPRINT_BITS}")
+        self.bits = bits
+        self.duplicates = 0
+        self._dtype = np.dtype(np.uint64) if bits == 64 else FINGERPRINT128
+        self._sorted = np.empty(0, dtype=self._dtype)
+        self._db = None
+        if spill_path is not None:
+            self._open_db(Path(spill_path))
+
+    # ---------------- almacenamiento ----------------
+
+    def _open_db(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value INTEGER)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS seen(hi INTEGER, lo INTEGER, PRIMARY KEY (hi, lo)) WITHOUT ROWID"
+        )
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'bits'").fetchone()
+        if row is None:
+            self._db.execute("INSERT INTO meta VALUES ('bits', ?)", (self.bits,))
+            self._db.commit()
+        elif row[0] != self.bits:
+            raise ValueError(f"{path} tiene huellas de {row[0]} bits (se pidieron {self.bits})")
+
+    def _split(self, values: np.ndarray) -> tuple:
+        # Mitades como enteros con signo (SQLite guarda INTEGER de 64 bits con signo)
+        if self.bits == 64:
+            return values.view(np.int64), np.zeros(len(values), dtype=np.int64)
+        return values["hi"].view(np.int64), values["lo"].view(np.int64)
+
+    def _contains(self, values: np.ndarray) -> np.ndarray:
+        if self._db is None:
+            pos = np.searchsorted(self._sorted, values)
+            found = pos < len(self._sorted)
+            found[found] = self._sorted[pos[found]] == values[found]
+            return found
+
+        hi, lo = self._split(values)
+        cur = self._db.cursor()
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS batch(i INTEGER PRIMARY KEY, hi INTEGER, lo INTEGER)")
+        cur.execute("DELETE FROM batch")
+        cur.executemany("INSERT INTO batch VALUES (?, ?, ?)", zip(range(len(values)), hi.tolist(), lo.tolist()))
+        found = np.zeros(len(values), dtype=bool)
+        found[[i for (i,) in cur.execute("SELECT i FROM batch JOIN seen USING (hi, lo)")]] = True
+        return found
+
+    def _insert(self, values: np.ndarray) -> None:
+        if self._db is None:
+            # Dos tramos ordenados: el ordenamiento estable los fusiona en O(n)
+            self._sorted = np.sort(np.concatenate([self._sorted, np.sort(values)]), kind="stable")
+            return
+        hi, lo = self._split(values)
+        self._db.executemany("INSERT OR IGNORE INTO seen VALUES (?, ?)", zip(hi.tolist(), lo.tolist()))
+        self._db.commit()
+
+    # ---------------- API ----------------
+
+    def add(self, values: np.ndarray) -> np.ndarray:
+        """
+        Registra las huellas de un bloque y devuelve la máscara de filas a
+        conservar: la primera aparición de cada huella no vista antes.
+        """
+        values = np.asarray(values, dtype=self._dtype)
+        keep = np.zeros(len(values), dtype=bool)
+        if len(values):
+            unique, first = np.unique(values, return_index=True)
+            new = ~self._contains(unique)
+            keep[first[new]] = True
+            self._insert(unique[new])
+        self.duplicates += int(len(values) - keep.sum())
+        return keep
+
+    def __len__(self) -> int:
+        if self._db is None:
+            return len(self._sorted)
+        return self._db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def save(self, path: str | Path) -> Path | None:
+        """
+        Persiste las huellas en Parquet (escritura atómica). Con spill_path ya
+        están en SQLite y no se escribe nada.
+        """
+        if self._db is not None:
+            self._db.commit()
+            return None
+        path = Path(path)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        if self.bits == 64:
+            table = pa.table({"row_hash": pa.array(self._sorted, pa.uint64())})
+        else:
+            table = pa.table({
+                "row_hash_hi": pa.array(self._sorted["hi"], pa.uint64()),
+                "row_hash_lo": pa.array(self._sorted["lo"], pa.uint64()),
+            })
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str | Path, bits: int = 64) -> "SeenRows":
+        """Huellas guardadas con save() (vacío si el archivo no existe)."""
+        seen = cls(bits)
+        path = Path(path)
+        if not path.exists():
+            return seen
+        table = pq.read_table(path)
+        stored_bits = 128 if "row_hash_hi" in table.column_names else 64
+        if stored_bits != bits:
+            raise ValueError(f"{path} tiene huellas de {stored_bits} bits (se pidieron {bits})")
+        if bits == 64:
+            seen._sorted = np.sort(table.column("row_hash").to_numpy())
+        else:
+            values = np.empty(table.num_rows, dtype=FINGERPRINT128)
+            values["hi"] = table.column("row_hash_hi").to_numpy()
+            values["lo"] = table.column("row_hash_lo").to_numpy()
+            seen._sorted = np.sort(values)
+        return seen
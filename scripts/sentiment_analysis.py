@@ -1,31 +1,142 @@
+import contextlib
+import threading
+import time
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+try:
+    from .processed_store import PROCESSED_COLUMNS, write_chunks
+    from .dtype_optimization import is_arrow_string
+    from .sentiment_cache import SentimentCache, text_hashes
+except ImportError:
+    from processed_store import PROCESSED_COLUMNS, write_chunks
+    from dtype_optimization import is_arrow_string
+    from sentiment_cache import SentimentCache, text_hashes
+
+# Puntajes de VADER, en el orden de polarity_scores
+SCORE_COLUMNS = ["neg", "neu", "pos", "compound"]
+
+# Etiquetas por compound: (-1, -0.05] negativo, (-0.05, 0.05] neutro, (0.05, 1] positivo
+SENTIMENT_LABELS = pd.CategoricalDtype(["negativo", "neutro", "positivo"], ordered=True)
+
+# Analizador compartido por el proceso (lexicon leído una sola vez), creado al primer uso
+_vader_ready = False
+_analyzer = None
+_analyzer_init_seconds = None
+_analyzer_lock = threading.Lock()
+
 
 def ensure_vader():
     
-    # Asegura que el lexicon de VADER esté descargado.
+    # Asegura que el lexicon de VADER esté descargado (se comprueba una vez por proceso).
     
-    import nltk
-    try:
-        nltk.data.find("sentiment/vader_lexicon.zip")
-    except LookupError:
-        print("Descargando VADER lexicon...")
-        nltk.download("vader_lexicon")
+    global _vader_ready
+    if _vader_ready:
+        return
+    with _analyzer_lock:
+        if _vader_ready:
+            return
+        import nltk
+        try:
+            nltk.data.find("sentiment/vader_lexicon.zip")
+        except LookupError:
+            print("Descargando VADER lexicon...")
+            nltk.download("vader_lexicon")
+        _vader_ready = True
 
 
-def analyze_sentiment_batch(texts):
+def get_analyzer():
     
-    # Analiza el sentimiento de una lista de textos usando VADER.
+    # SentimentIntensityAnalyzer único del proceso, creado al primer uso de forma
+    # segura entre hilos. polarity_scores no modifica el analizador: se comparte.
     
+    global _analyzer, _analyzer_init_seconds
+    if _analyzer is not None:
+        return _analyzer
     ensure_vader()
-    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+    with _analyzer_lock:
+        if _analyzer is None:
+            from nltk.sentiment.vader import SentimentIntensityAnalyzer
+            started = time.perf_counter()
+            analyzer = SentimentIntensityAnalyzer()
+            _analyzer_init_seconds = time.perf_counter() - started
+            _analyzer = analyzer
+    return _analyzer
+
+
+def analyzer_init_seconds() -> float | None:
+    
+    # Segundos que tomó crear el analizador (None si aún no se creó).
+    
+    return _analyzer_init_seconds
+
+
+def analyze_sentiment_batch(texts, cache: SentimentCache | None = None):
+    
+    # Analiza el sentimiento de una lista de textos usando VADER.
+    # Cada texto distinto se puntúa una vez; con cache, los ya puntuados
+    # (en esta u otras corridas) no se recalculan.
+    
+    sia = get_analyzer()
+    texts = texts if isinstance(texts, pd.Series) else pd.Series(list(texts), dtype=object)
+    scores, _ = distinct_scores(texts, lambda missing: score_texts(missing, sia), cache)
+    return pd.DataFrame(scores, columns=SCORE_COLUMNS, index=texts.index)
+
+
+def score_texts(texts, sia) -> np.ndarray:
+    
+    # Puntajes VADER de cada texto en un arreglo (n, 4) preasignado, columnas
+    # en el orden de SCORE_COLUMNS, sin crear un pd.Series por reseña.
     
-    sia = SentimentIntensityAnalyzer()
-    scores = texts.apply(sia.polarity_scores).apply(pd.Series)
+    texts = texts.tolist() if hasattr(texts, "tolist") else list(texts)
+    scores = np.empty((len(texts), len(SCORE_COLUMNS)), dtype=np.float64)
+    for i, text in enumerate(texts):
+        s = sia.polarity_scores(text)
+        scores[i] = (s["neg"], s["neu"], s["pos"], s["compound"])
     return scores
 
 
+def cached_scores(texts: pd.Series, scorer, cache: SentimentCache | None = None) -> np.ndarray:
+    
+    # Puntajes (n, 4) de texts: los que están en cache se leen de ahí y solo los
+    # demás pasan por scorer (función texts → arreglo (m, 4)) y se agregan al cache.
+    
+    if cache is None:
+        return scorer(texts)
+    hashes = text_hashes(texts)
+    scores, found = cache.lookup(hashes)
+    missing = np.flatnonzero(~found)
+    if len(missing):
+        new_scores = scorer(texts.iloc[missing])
+        scores[missing] = new_scores
+        cache.store(hashes[missing], new_scores)
+    return scores
+
+
+def distinct_scores(texts: pd.Series, scorer, cache: SentimentCache | None = None) -> tuple:
+    
+    # Puntúa solo los textos distintos (muchas reseñas quedan en "Location",
+    # "Nothing"...) y reparte los puntajes a cada fila.
+    # Devuelve (puntajes (n, 4), número de textos distintos).
+    
+    codes, uniques = pd.factorize(texts, use_na_sentinel=False)
+    scores = cached_scores(pd.Series(uniques), scorer, cache)
+    return scores[codes], len(uniques)
+
+
+def label_sentiment(compound) -> pd.Categorical:
+    
+    # Etiqueta vectorizada: mismo resultado que pd.cut(compound, [-1, -0.05, 0.05, 1])
+    # (intervalos cerrados a la derecha; fuera de (-1, 1] o NaN queda nulo).
+    
+    compound = np.asarray(compound, dtype=np.float64)
+    codes = np.searchsorted([-0.05, 0.05], compound, side="left").astype(np.int8)
+    codes[~((compound > -1.0) & (compound <= 1.0))] = -1
+    return pd.Categorical.from_codes(codes, dtype=SENTIMENT_LABELS)
+
+
 def classify_sentiment(compound_score):
     
     # Clasifica un score compuesto en categoría de sentimiento.
@@ -38,64 +149,125 @@ def classify_sentiment(compound_score):
         return "neutro"
 
 
-def sentiment_chunked(df, chunk_size=100_000, stream_path: Path | None = None):
+def _review_texts(chunk: pd.DataFrame) -> pd.Series:
     
-    # Procesa sentimiento por bloques para manejar grandes datasets.
+    # review_text del bloque como texto sin nulos (lo que se puntúa).
     
-    ensure_vader()
-    from nltk.sentiment.vader import SentimentIntensityAnalyzer
-    sia = SentimentIntensityAnalyzer()
+    if "review_text" not in chunk.columns:
+        raise ValueError("DataFrame debe contener columna 'review_text'")
+    
+    # (el texto en buffers Arrow ya es string: no se convierte a objetos str)
+    texts = chunk["review_text"].fillna("")
+    if not is_arrow_string(texts):
+        texts = texts.astype(str)
+    return texts
 
-    outs = []
-    wrote_header = False
-    n = len(df)
 
-    print(f"Analizando sentimiento en {n:,} reseñas...")
+def _with_scores(chunk: pd.DataFrame, scores: np.ndarray) -> pd.DataFrame:
+    
+    # Agrega los puntajes (n, 4) y la etiqueta al bloque; devuelve las columnas de salida.
+    # Solo se agregan/reemplazan columnas: la copia superficial no duplica el bloque.
+    
+    chunk = chunk.copy(deep=False)
+    for j, col in enumerate(SCORE_COLUMNS):
+        chunk[col] = scores[:, j]
+    
+    # Clasificar sentimiento
+    chunk["sentiment_label"] = label_sentiment(scores[:, SCORE_COLUMNS.index("compound")])
 
-    for start in range(0, n, chunk_size):
-        end = min(start + chunk_size, n)
-        chunk = df.iloc[start:end].copy()
+    # Columnas de salida (la selección por lista ya es un DataFrame nuevo)
+    return chunk[[c for c in PROCESSED_COLUMNS if c in chunk.columns]].copy(deep=False)
 
-        # Asegurar que review_text existe y es string
-        if "review_text" not in chunk.columns:
-            raise ValueError("DataFrame debe contener columna 'review_text'")
-        
-        chunk["review_text"] = chunk["review_text"].fillna("").astype(str)
-        
-        # Calcular puntajes VADER
-        scores = chunk["review_text"].apply(sia.polarity_scores).apply(pd.Series)
-        chunk = pd.concat([chunk, scores], axis=1)
-        
-        # Clasificar sentimiento
-        chunk["sentiment_label"] = pd.cut(
-            chunk["compound"], 
-            bins=[-1.0, -0.05, 0.05, 1.0],
-            labels=["negativo", "neutro", "positivo"]
-        )
-
-        # Columnas de salida
-        cols_keep = [
-            "Hotel_Name", "Hotel_Address", "Reviewer_Nationality",
-            "Positive_Review", "Negative_Review", "review_text",
-            "compound", "pos", "neu", "neg", "sentiment_label",
-            "Average_Score", "Reviewer_Score", "Tags", "lat", "lng"
-        ]
-        chunk_out = chunk[[c for c in cols_keep if c in chunk.columns]].copy()
-
-        # Streaming a CSV o acumular en memoria
-        if stream_path:
-            mode = "a" if wrote_header else "w"
-            chunk_out.to_csv(
-                stream_path, 
-                index=False, 
-                encoding="utf-8", 
-                mode=mode, 
-                header=not wrote_header
-            )
-            wrote_header = True
+
+def score_chunk(chunk: pd.DataFrame, sia) -> pd.DataFrame:
+    
+    # Calcula puntajes VADER y etiqueta para un bloque; devuelve las columnas de salida.
+    
+    return _with_scores(chunk, score_texts(_review_texts(chunk), sia))
+
+
+# Cada proceso del pool crea su propio analizador al iniciar
+def _init_worker():
+    get_analyzer()
+
+
+def _score_worker(texts) -> np.ndarray:
+    return score_texts(texts, get_analyzer())
+
+
+def _parallel_scores(texts: pd.Series, executor: ProcessPoolExecutor, workers: int) -> np.ndarray:
+    
+    # Puntajes de un bloque repartido en particiones contiguas entre los procesos;
+    # executor.map devuelve las particiones en orden, así que el resultado es el de la serie.
+    # Solo viaja el texto (ida) y el arreglo de puntajes (vuelta).
+    
+    bounds = np.linspace(0, len(texts), min(workers, len(texts)) + 1).astype(int)
+    parts = [texts.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+    if not parts:
+        return np.empty((0, len(SCORE_COLUMNS)), dtype=np.float64)
+    return np.concatenate(list(executor.map(_score_worker, parts)))
+
+
+def sentiment_iter(chunks, workers: int = 1, cache: SentimentCache | None = None):
+    
+    # Etapa generadora: puntúa cada bloque que llega y lo entrega sin acumular.
+    # Con workers > 1 cada bloque se reparte entre procesos (cada uno con su
+    # propio analizador) y se entrega en el mismo orden que en serie.
+    # Cada texto distinto del bloque se puntúa una sola vez, y con cache solo
+    # los que no están en el cache persistente.
+    
+    ensure_vader()
+    with contextlib.ExitStack() as stack:
+        sia, executor = None, None
+        if workers > 1:
+            print(f"Sentimiento en {workers} procesos")
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers, initializer=_init_worker))
         else:
-            outs.append(chunk_out)
+            sia = get_analyzer()
+            print(f"Analizador VADER listo (inicialización: {analyzer_init_seconds():.2f} s)")
+
+        start, distinct = 0, 0
+        for chunk in chunks:
+            end = start + len(chunk)
+            texts = _review_texts(chunk)
+            if executor is None:
+                scores, n_distinct = distinct_scores(texts, lambda missing: score_texts(missing, sia), cache)
+            else:
+                scores, n_distinct = distinct_scores(
+                    texts, lambda missing: _parallel_scores(missing, executor, workers), cache
+                )
+            distinct += n_distinct
+            yield _with_scores(chunk, scores)
+            print(f"   Bloque {start:,}-{end:,} listo ({n_distinct:,} textos distintos)")
+            start = end
+        
+        if start:
+            print(f"Textos distintos puntuados: {distinct:,} de {start:,} "
+                  f"({1 - distinct / start:.1%} repetidos dentro de cada bloque)")
+        if cache is not None:
+            stats = cache.stats()
+            rate = f" ({stats['hit_rate']:.1%} aciertos)" if stats["hit_rate"] is not None else ""
+            print(f"Cache de sentimiento: {stats['hits']:,} aciertos, {stats['misses']:,} fallos{rate}")
+            if stats["errors"]:
+                print(f"   {stats['errors']:,} operaciones del cache fallaron (esos textos se puntuaron sin cache)")
+
+
+def sentiment_chunked(df, chunk_size=100_000, stream_path: Path | None = None, workers: int = 1,
+                      cache: SentimentCache | None = None):
+    
+    # Procesa sentimiento por bloques para manejar grandes datasets.
+    # workers > 1 reparte cada bloque en un pool de procesos (salida idéntica).
+    # cache: puntajes persistentes por texto (ver sentiment_cache.SentimentCache).
+    
+    n = len(df)
+    print(f"Analizando sentimiento en {n:,} reseñas...")
+
+    chunks = (df.iloc[start:start + chunk_size] for start in range(0, n, chunk_size))
+    scored = sentiment_iter(chunks, workers=workers, cache=cache)
 
-        print(f"   Bloque {start:,}-{end:,} listo")
+    # Streaming a Parquet/CSV o acumular en memoria
+    if stream_path:
+        write_chunks(scored, stream_path)
+        return None
 
-    return None if stream_path else pd.concat(outs, ignore_index=True)
\ No newline at end of file
+    return pd.concat(list(scored), ignore_index=True)
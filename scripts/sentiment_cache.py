@@ -0,0 +1,134 @@
+import itertools
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+try:
+    from .checkpoints import file_digest
+except ImportError:
+    from checkpoints import file_digest
+
+# ============================================================
+# Cache persistente de puntajes VADER por hash del texto limpio
+# ============================================================
+
+# Número de puntajes por texto (neg, neu, pos, compound)
+N_SCORES = 4
+
+
+def text_hashes(texts) -> np.ndarray:
+    """Hash de 64 bits (uint64) de cada texto limpio, estable entre corridas."""
+    texts = texts.tolist() if hasattr(texts, "tolist") else list(texts)
+    return pd.util.hash_array(np.asarray(texts, dtype=object))
+
+
+def vader_stamp() -> str:
+    """Versión de nltk + hash del lexicon: si cambian, los puntajes guardados no sirven."""
+    import nltk
+    lexicon = nltk.data.find("sentiment/vader_lexicon.zip")
+    path = getattr(getattr(lexicon, "zipfile", None), "filename", None) or str(lexicon)
+    return f"nltk-{nltk.__version__}-{file_digest(path)}"
+
+
+class SentimentCache:
+    """
+    Puntajes (neg, neu, pos, compound) por hash del texto limpio en una tabla
+    SQLite. lookup() devuelve los puntajes conocidos y cuenta aciertos/fallos;
+    store() agrega los nuevos. Cada versión de VADER (stamp) tiene sus propias
+    filas: procesos con versiones distintas comparten el archivo sin borrarse
+    los puntajes. Si SQLite falla (p. ej. "database is locked"), lookup() no
+    devuelve aciertos y store() no guarda: se puntúa sin cache. Se puede usar
+    desde varios hilos (p. ej. la API).
+    """
+
+    def __init__(self, path: str | Path, stamp: str | None = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS stamps(id INTEGER PRIMARY KEY, stamp TEXT UNIQUE)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vader_scores("
+            "stamp_id INTEGER, hash INTEGER, neg REAL, neu REAL, pos REAL, compound REAL, "
+            "PRIMARY KEY (stamp_id, hash)) WITHOUT ROWID"
+        )
+        stamp = stamp or vader_stamp()
+        self._db.execute("INSERT OR IGNORE INTO stamps(stamp) VALUES (?)", (stamp,))
+        self._stamp_id = self._db.execute("SELECT id FROM stamps WHERE stamp = ?", (stamp,)).fetchone()[0]
+        self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM vader_scores WHERE stamp_id = ?", (self._stamp_id,)
+            ).fetchone()[0]
+
+    def lookup(self, hashes: np.ndarray) -> tuple:
+        """
+        Puntajes guardados de cada hash: (arreglo (n, 4), máscara de encontrados).
+        Las filas no encontradas quedan en NaN.
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        scores = np.full((len(hashes), N_SCORES), np.nan, dtype=np.float64)
+        found = np.zeros(len(hashes), dtype=bool)
+        rows = []
+        if len(hashes):
+            with self._lock:
+                try:
+                    cur = self._db.cursor()
+                    cur.execute("CREATE TEMP TABLE IF NOT EXISTS batch(i INTEGER PRIMARY KEY, hash INTEGER)")
+                    cur.execute("DELETE FROM batch")
+                    # SQLite guarda INTEGER de 64 bits con signo
+                    cur.executemany("INSERT INTO batch VALUES (?, ?)", enumerate(hashes.view(np.int64).tolist()))
+                    rows = cur.execute(
+                        "SELECT i, neg, neu, pos, compound FROM batch JOIN vader_scores USING (hash) "
+                        "WHERE stamp_id = ?", (self._stamp_id,)
+                    ).fetchall()
+                except sqlite3.Error:
+                    self.errors += 1
+                    rows = []
+        if rows:
+            rows = np.array(rows, dtype=np.float64)
+            positions = rows[:, 0].astype(np.int64)
+            scores[positions] = rows[:, 1:]
+            found[positions] = True
+        hits = int(found.sum())
+        self.hits += hits
+        self.misses += len(hashes) - hits
+        return scores, found
+
+    def store(self, hashes: np.ndarray, scores: np.ndarray) -> None:
+        """Guarda los puntajes (n, 4) de cada hash (los ya guardados se conservan)."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(hashes):
+            return
+        with self._lock:
+            try:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO vader_scores VALUES (?, ?, ?, ?, ?, ?)",
+                    zip(itertools.repeat(self._stamp_id), hashes.view(np.int64).tolist(),
+                        *np.asarray(scores, dtype=np.float64).T.tolist())
+                )
+                self._db.commit()
+            except sqlite3.Error:
+                self.errors += 1
+                self._db.rollback()
+
+    def stats(self) -> dict:
+        """Aciertos, fallos, errores de SQLite y tasa de aciertos desde que se abrió el cache."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,182 @@
+import ast
+import re
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from scipy.sparse import csr_matrix, vstack
+
+# ============================================================
+# Etiquetas (Tags) como vocabulario + matriz dispersa multi-hot
+# ============================================================
+
+# "[' Leisure trip ', ' Couple ', ' Stayed 2 nights ']" → noches = 2
+_NIGHTS_PATTERN = re.compile(r"Stayed (\d+) nights?")
+
+
+def parse_tags(value) -> list:
+    """Lista de etiquetas (sin espacios alrededor) de un valor crudo de Tags."""
+    if not isinstance(value, str) or not value.strip():
+        return []
+    try:
+        items = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        items = value.strip("[]").split("', '")
+    if isinstance(items, str):
+        items = [items]
+    tags = [str(item).strip(" '") for item in items]
+    return [tag for tag in tags if tag]
+
+
+def tags_path_for(path: str | Path) -> Path:
+    """Ruta del índice de etiquetas junto al archivo de reseñas (<nombre>_tags.npz)."""
+    path = Path(path)
+    return path.with_name(f"{path.stem}_tags.npz")
+
+
+class TagMatrix:
+    """
+    Etiquetas de cada reseña ya parseadas: vocabulario ordenado, matriz CSR
+    booleana reseña × etiqueta (multi-hot) y noches de estancia (0 = sin dato).
+    Las filas siguen el orden del archivo de reseñas.
+    """
+
+    def __init__(self, vocabulary: list, matrix: csr_matrix, nights: np.ndarray):
+        self.vocabulary = list(vocabulary)
+        self.matrix = matrix
+        self.nights = nights
+        self._index = {tag: j for j, tag in enumerate(self.vocabulary)}
+        self._columns = None  # CSC perezosa: filas de cada etiqueta
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @classmethod
+    def from_series(cls, tags: pd.Series) -> "TagMatrix":
+        """Parsea la columna Tags una vez por valor distinto y reparte el resultado."""
+        codes, uniques = pd.factorize(tags, use_na_sentinel=True)
+        parsed = [parse_tags(value) for value in uniques]
+        vocabulary = sorted({tag for items in parsed for tag in items})
+        index = {tag: j for j, tag in enumerate(vocabulary)}
+
+        # Matriz por valor distinto (+ una fila vacía para los nulos) y luego por reseña
+        indptr = np.zeros(len(parsed) + 2, dtype=np.int64)
+        indptr[1:len(parsed) + 1] = np.cumsum([len(set(items)) for items in parsed])
+        indptr[-1] = indptr[-2]
+        indices = np.fromiter(
+            (index[tag] for items in parsed for tag in sorted(set(items), key=index.get)),
+            dtype=np.int32, count=int(indptr[-1])
+        )
+        per_value = csr_matrix(
+            (np.ones(len(indices), dtype=bool), indices, indptr),
+            shape=(len(parsed) + 1, len(vocabulary))
+        )
+        codes = np.where(codes < 0, len(parsed), codes)
+
+        nights_per_value = np.zeros(len(parsed) + 1, dtype=np.int16)
+        for k, value in enumerate(uniques):
+            match = _NIGHTS_PATTERN.search(value) if isinstance(value, str) else None
+            if match:
+                nights_per_value[k] = int(match.group(1))
+
+        return cls(vocabulary, per_value[codes], nights_per_value[codes])
+
+    @classmethod
+    def from_batches(cls, batches) -> "TagMatrix":
+        """
+        Igual que from_series sobre la concatenación de los lotes (Series), sin
+        cargar la columna completa: cada lote se parsea por separado y sus
+        columnas se traducen al vocabulario común antes de apilar las matrices.
+        """
+        ids = {}  # etiqueta → id en orden de aparición
+        blocks, nights = [], []
+        for tags in batches:
+            part = cls.from_series(tags)
+            to_id = np.array([ids.setdefault(tag, len(ids)) for tag in part.vocabulary], dtype=np.int32)
+            blocks.append((part.matrix.indptr, to_id[part.matrix.indices]))
+            nights.append(part.nights)
+
+        # Vocabulario ordenado como en from_series: id de aparición → posición
+        vocabulary = sorted(ids)
+        position = np.empty(len(ids), dtype=np.int32)
+        position[[ids[tag] for tag in vocabulary]] = np.arange(len(vocabulary), dtype=np.int32)
+
+        if not blocks:
+            return cls(vocabulary, csr_matrix((0, 0), dtype=bool), np.zeros(0, dtype=np.int16))
+        matrix = vstack([
+            csr_matrix(
+                (np.ones(len(indices), dtype=bool), position[indices], indptr),
+                shape=(len(indptr) - 1, len(vocabulary))
+            )
+            for indptr, indices in blocks
+        ], format="csr")
+        matrix.sort_indices()
+        return cls(vocabulary, matrix, np.concatenate(nights))
+
+    def counts(self) -> pd.Series:
+        """Número de reseñas por etiqueta (de mayor a menor)."""
+        totals = np.asarray(self.matrix.sum(axis=0)).ravel()
+        return pd.Series(totals, index=self.vocabulary).sort_values(ascending=False, kind="stable")
+
+    def mask(self, tags: list) -> np.ndarray:
+        """Máscara de reseñas que tienen todas las etiquetas pedidas."""
+        if self._columns is None:
+            self._columns = self.matrix.tocsc()
+        mask = np.ones(len(self), dtype=bool)
+        for tag in tags:
+            j = self._index.get(tag.strip())
+            if j is None:
+                return np.zeros(len(self), dtype=bool)
+            has_tag = np.zeros(len(self), dtype=bool)
+            has_tag[self._columns.indices[self._columns.indptr[j]:self._columns.indptr[j + 1]]] = True
+            mask &= has_tag
+        return mask
+
+    def nights_mask(self, nights_min: int | None = None, nights_max: int | None = None) -> np.ndarray:
+        """
+        Máscara de reseñas con noches de estancia dentro del rango (extremos
+        incluidos). Con algún extremo, las reseñas sin dato (0) quedan fuera.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if nights_min is not None or nights_max is not None:
+            mask &= self.nights > 0
+        if nights_min is not None:
+            mask &= self.nights >= nights_min
+        if nights_max is not None:
+            mask &= self.nights <= nights_max
+        return mask
+
+    def save(self, path: str | Path) -> Path:
+        """Guarda vocabulario, matriz y noches en un .npz comprimido."""
+        path = Path(path)
+        matrix = self.matrix.tocsr()
+        np.savez_compressed(
+            path,
+            vocabulary=np.array(self.vocabulary, dtype=str),
+            indptr=matrix.indptr, indices=matrix.indices,
+            nights=self.nights,
+        )
+        return path
+
+    @classmethod
+    def load(cls, path: str | Path) -> "TagMatrix":
+        """Índice guardado con save()."""
+        with np.load(path, allow_pickle=False) as data:
+            vocabulary = data["vocabulary"].tolist()
+            indptr, indices = data["indptr"], data["indices"]
+            matrix = csr_matrix(
+                (np.ones(len(indices), dtype=bool), indices, indptr),
+                shape=(len(indptr) - 1, len(vocabulary))
+            )
+            return cls(vocabulary, matrix, data["nights"])
+
+
+def write_tag_matrix(tags, output_path: str | Path) -> Path:
+    """
+    Parsea la columna Tags de la salida (Series completa o iterable de lotes)
+    y guarda su índice (<salida>_tags.npz).
+    """
+    tag_matrix = TagMatrix.from_series(tags) if isinstance(tags, pd.Series) else TagMatrix.from_batches(tags)
+    path = tag_matrix.save(tags_path_for(output_path))
+    print(f"Índice de etiquetas guardado en: {path} "
+          f"({len(tag_matrix.vocabulary):,} etiquetas, {tag_matrix.matrix.nnz:,} asignaciones)")
+    return path
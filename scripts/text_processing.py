@@ -1,4 +1,14 @@
 import re
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Espacios ASCII que str.strip() y \s (re de Python) reconocen; en RE2 (Arrow)
+# \s no incluye \v ni \x1c-\x1f, por eso se listan explícitamente
+_ASCII_SPACES = " \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+_ASCII_SPACE_RUN = r"[ \t\n\r\x0b\x0c\x1c-\x1f]+"
+_DEFAULT_PHRASES = ["No Negative", "No Positive"]
 
 
 def clean_text(text: str) -> str:
@@ -17,6 +27,70 @@ def clean_text(text: str) -> str:
     return text.strip()
 
 
+def _to_arrow(series: pd.Series) -> pa.Array:
+    
+    # Columna como arreglo Arrow de strings; lo que no es str queda nulo.
+    
+    if isinstance(series.array, pd.arrays.ArrowExtensionArray):
+        return pa.array(series.array).cast(pa.string())
+    raw = series.to_numpy(dtype=object)
+    is_str = np.fromiter((isinstance(v, str) for v in raw), dtype=bool, count=len(raw))
+    return pa.array(np.where(is_str, raw, None), type=pa.string())
+
+
+def _from_arrow(values: pa.Array, like: pd.Series) -> pd.Series:
+    
+    # Resultado con el índice de like: texto Arrow si like lo es, si no object.
+    
+    if isinstance(like.array, pd.arrays.ArrowExtensionArray):
+        return pd.Series(pd.arrays.ArrowExtensionArray(values), index=like.index, name=like.name)
+    return pd.Series(values.to_numpy(zero_copy_only=False), index=like.index, name=like.name, dtype=object)
+
+
+def _clean_arrow(values: pa.Array) -> pa.Array:
+    
+    # clean_text sobre un arreglo Arrow: los textos ASCII se limpian con
+    # kernels de Arrow y solo los no ASCII pasan por clean_text.
+    
+    cleaned = pc.ascii_trim(values, _ASCII_SPACES)
+    for phrase in _DEFAULT_PHRASES:
+        cleaned = pc.replace_substring(cleaned, phrase, "")
+    cleaned = pc.replace_substring_regex(cleaned, _ASCII_SPACE_RUN, " ")
+    cleaned = pc.ascii_trim(cleaned, _ASCII_SPACES)
+    cleaned = pc.fill_null(cleaned, "")
+    
+    # Textos con caracteres no ASCII: \s y strip() de Python abarcan espacios Unicode
+    non_ascii = pc.invert(pc.fill_null(pc.string_is_ascii(values), True))
+    if pc.any(non_ascii).as_py():
+        fallback = [clean_text(v) for v in pc.filter(values, non_ascii).to_pylist()]
+        cleaned = pc.replace_with_mask(cleaned, non_ascii, pa.array(fallback, type=pa.string()))
+    
+    return cleaned
+
+
+def _join_arrow(positive: pa.Array, negative: pa.Array) -> pa.Array:
+    
+    # f"{p}. {n}".strip(". ") elemento a elemento (los nulos cuentan como "").
+    
+    joined = pc.binary_join_element_wise(pc.fill_null(positive, ""), pc.fill_null(negative, ""), ". ")
+    return pc.ascii_trim(joined, ". ")
+
+
+def clean_text_series(series: pd.Series) -> pd.Series:
+    
+    # Igual que series.apply(clean_text) pero por columna.
+    # Conserva el índice; devuelve texto Arrow si la entrada lo es, si no object.
+    
+    return _from_arrow(_clean_arrow(_to_arrow(series)), series)
+
+
+def join_reviews(positive: pd.Series, negative: pd.Series) -> pd.Series:
+    
+    # Une dos columnas ya limpias como f"{p}. {n}".strip(". "), por columna.
+    
+    return _from_arrow(_join_arrow(_to_arrow(positive), _to_arrow(negative)), positive)
+
+
 def compose_review(row) -> str:
     
     # Combina las reseñas positivas y negativas en un solo texto
@@ -28,21 +102,81 @@ def compose_review(row) -> str:
     return combined
 
 
+def compose_reviews(positive: pd.Series, negative: pd.Series) -> pd.Series:
+    
+    # Igual que compose_review fila a fila, por columna: limpia ambos segmentos y los une.
+    
+    return _from_arrow(
+        _join_arrow(_clean_arrow(_to_arrow(positive)), _clean_arrow(_to_arrow(negative))),
+        positive
+    )
+
+
+def add_review_text(df,
+                    positive_column: str = "Positive_Review",
+                    negative_column: str = "Negative_Review",
+                    text_column: str = "review_text"):
+    
+    # Deriva la columna combinada a partir de los dos segmentos guardados
+    # (el texto combinado no se almacena). No modifica los segmentos.
+    
+    empty = pd.Series("", index=df.index, dtype=object)
+    positive = df[positive_column] if positive_column in df.columns else empty
+    negative = df[negative_column] if negative_column in df.columns else empty
+    
+    df = df.copy(deep=False)
+    df[text_column] = compose_reviews(positive, negative)
+    return df
+
+
 def clean_dataframe_reviews(df):
     
     # Limpia y combina las columnas de reseñas del DataFrame.
+    # (solo se reemplazan columnas completas: basta una copia superficial)
     
-    df = df.copy()
+    df = df.copy(deep=False)
     
     print("Limpiando texto de reseñas...")
     
     # Limpiar columnas individuales
     for col in ['Positive_Review', 'Negative_Review']:
         if col in df.columns:
-            df[col] = df[col].apply(clean_text)
+            df[col] = clean_text_series(df[col])
     
     # Crear columna combinada
     print("Combinando reseñas positivas y negativas...")
-    df['review_text'] = df.apply(compose_review, axis=1)
+    empty = pd.Series("", index=df.index, dtype=object)
+    df['review_text'] = compose_reviews(
+        df.get('Positive_Review', empty), df.get('Negative_Review', empty)
+    )
+    
+    return df
+
+
+def clean_reviews(df, combined_columns=("review_text",), inplace: bool = False):
+    
+    # Etapa única de limpieza de reseñas: limpia cada segmento una sola vez y
+    # crea las columnas combinadas pedidas (review_text, Combined_Review...),
+    # todas con el mismo texto f"{pos}. {neg}".strip(". ").
+    # Con inplace=True las columnas se escriben sobre df.
+    
+    if not inplace:
+        df = df.copy(deep=False)
+    
+    print("Limpiando texto de reseñas...")
+    segments = {}
+    for col in ['Positive_Review', 'Negative_Review']:
+        if col in df.columns:
+            df[col] = clean_text_series(df[col])
+            segments[col] = df[col]
+    
+    if combined_columns:
+        print(f"Combinando reseñas positivas y negativas en: {', '.join(combined_columns)}")
+        empty = pd.Series("", index=df.index, dtype=object)
+        combined = join_reviews(
+            segments.get('Positive_Review', empty), segments.get('Negative_Review', empty)
+        )
+        for col in combined_columns:
+            df[col] = combined
     
     return df
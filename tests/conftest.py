@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Los módulos del pipeline se importan como en api_app.py (scripts/ en sys.path)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
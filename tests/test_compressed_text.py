@@ -0,0 +1,18 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from compressed_text import CompressedTextColumn
+
+
+def test_take_round_trips_multi_chunk_arrow_series():
+    # Como read_arrow_mmap: una columna Arrow con un chunk por batch IPC
+    texts = [f"review {i}" if i % 7 else None for i in range(2500)]
+    chunked = pa.chunked_array([texts[:1000], texts[1000:2200], texts[2200:]], type=pa.string())
+    series = pd.Series(pd.arrays.ArrowExtensionArray(chunked), name="Positive_Review")
+
+    column = CompressedTextColumn.from_series(series, block_size=256)
+    positions = np.array([2499, 0, 999, 1000, 7, 2200, 1337, 0])
+    assert len(column) == len(texts)
+    taken = column.take(positions)
+    assert pa.array(taken.array).to_pylist() == [texts[p] for p in positions]
@@ -0,0 +1,16 @@
+import pandas as pd
+import pyarrow as pa
+
+from dtype_optimization import join_text
+
+
+def test_join_text_multi_chunk_arrow_series():
+    chunked = pa.chunked_array([["great room", None, "clean"], [None, "quiet street"]], type=pa.string())
+    series = pd.Series(pd.arrays.ArrowExtensionArray(chunked))
+    assert join_text(series) == "great room clean quiet street"
+    assert join_text(series, sep=". ") == join_text(series.astype(object), sep=". ")
+
+
+def test_join_text_only_nulls():
+    chunked = pa.chunked_array([[None], [None, None]], type=pa.string())
+    assert join_text(pd.Series(pd.arrays.ArrowExtensionArray(chunked))) == ""
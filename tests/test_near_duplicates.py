@@ -0,0 +1,32 @@
+import numpy as np
+
+import near_duplicates
+from near_duplicates import near_duplicate_of
+
+BASE = ("The room was clean and quiet, the staff at the front desk were friendly "
+        "and breakfast had plenty of fresh fruit and good coffee every morning")
+
+
+def test_planted_near_duplicate_pair():
+    texts = [
+        "Terrible location next to a noisy construction site and the bed was broken",
+        BASE,
+        "Nothing",
+        BASE + " too",
+        "Lovely rooftop bar with a view over the canals, a bit pricey but worth it",
+    ]
+    assert near_duplicate_of(texts).tolist() == [-1, -1, -1, 1, -1]
+
+
+def test_colliding_non_duplicate_does_not_hide_pair(monkeypatch):
+    # Una sola banda de 4 valores: las tres filas caen en la misma cubeta, pero
+    # solo 1 y 2 son casi duplicados; la fila 0 coincide únicamente en la banda
+    rng = np.random.default_rng(0)
+    signatures = rng.integers(0, 2**32, size=(3, 128), dtype=np.uint32)
+    signatures[:, :4] = signatures[0, :4]
+    signatures[2, :110] = signatures[1, :110]
+    monkeypatch.setattr(near_duplicates, "minhash_signatures",
+                        lambda texts, **kwargs: (signatures, np.full(3, 10)))
+    monkeypatch.setattr(near_duplicates, "lsh_params", lambda threshold, num_perm: (1, 4))
+
+    assert near_duplicate_of(["x", "y", "z"]).tolist() == [-1, -1, 1]
@@ -0,0 +1,31 @@
+import pandas as pd
+
+from processed_store import HOTEL_ID, HotelDimension
+
+
+def _reviews(score: float) -> pd.DataFrame:
+    return pd.DataFrame({
+        "Hotel_Name": ["Hotel Arena", "Hotel Arena", "Park Plaza"],
+        "Hotel_Address": ["s Gravesandestraat 55 1092 AA Amsterdam Netherlands"] * 2
+                         + ["Westminster Bridge Road London SE1 7UT United Kingdom"],
+        "Average_Score": [score, score, 8.1],
+        "lat": [52.36, 52.36, 51.50],
+        "lng": [4.92, 4.92, -0.12],
+        "Reviewer_Score": [7.5, 9.0, 6.3],
+    })
+
+
+def test_changed_score_updates_hotel_in_place():
+    dimension = HotelDimension()
+    first = dimension.split(_reviews(7.7))
+    assert first[HOTEL_ID].tolist() == [0, 0, 1]
+
+    # Ingesta incremental: el mismo hotel con otro puntaje conserva su id
+    reloaded = HotelDimension.from_frame(dimension.to_frame())
+    second = reloaded.split(_reviews(7.9))
+    assert second[HOTEL_ID].tolist() == [0, 0, 1]
+
+    hotels = reloaded.to_frame()
+    assert len(hotels) == 2
+    assert hotels["Average_Score"].tolist() == [7.9, 8.1]
+    assert hotels["Hotel_City"].tolist() == ["Amsterdam", "London"]
@@ -0,0 +1,58 @@
+import sqlite3
+
+import numpy as np
+
+from sentiment_cache import SentimentCache
+
+HASHES = np.array([1, 2**63 + 5, 42], dtype=np.uint64)
+SCORES = np.array([[0.1, 0.8, 0.1, 0.0], [0.0, 0.5, 0.5, 0.6], [0.7, 0.3, 0.0, -0.5]])
+
+
+def test_stamps_keep_their_own_scores(tmp_path):
+    path = tmp_path / "sentiment.sqlite"
+    old = SentimentCache(path, stamp="nltk-old")
+    old.store(HASHES, SCORES)
+    old.close()
+
+    # Otra versión de VADER no ve ni borra los puntajes de la anterior
+    new = SentimentCache(path, stamp="nltk-new")
+    assert not new.lookup(HASHES)[1].any()
+    new.store(HASHES[:1], SCORES[:1] + 1)
+    new.close()
+
+    old = SentimentCache(path, stamp="nltk-old")
+    scores, found = old.lookup(HASHES)
+    assert found.all() and np.array_equal(scores, SCORES)
+    assert len(old) == 3
+
+
+def test_sqlite_errors_fall_back_to_no_cache(tmp_path):
+    path = tmp_path / "sentiment.sqlite"
+    cache = SentimentCache(path, stamp="nltk-test")
+    cache.store(HASHES, SCORES)
+
+    # Otro proceso con el archivo bloqueado para escritura
+    other = sqlite3.connect(path, timeout=0)
+    other.execute("BEGIN EXCLUSIVE")
+    cache._db.execute("PRAGMA busy_timeout = 0")
+    scores, found = cache.lookup(HASHES)
+    cache.store(np.array([7], dtype=np.uint64), SCORES[:1])
+    other.rollback()
+
+    assert not found.any() and np.isnan(scores).all()
+    assert cache.stats()["errors"] == 2
+    assert cache.lookup(HASHES)[1].all()
+
+
+def test_open_keeps_unrelated_tables(tmp_path):
+    path = tmp_path / "sentiment.sqlite"
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE scores(hash INTEGER PRIMARY KEY, compound REAL)")
+    db.execute("INSERT INTO scores VALUES (1, 0.5)")
+    db.commit()
+    db.close()
+
+    SentimentCache(path, stamp="nltk-test").close()
+    db = sqlite3.connect(path)
+    assert db.execute("SELECT COUNT(*) FROM scores").fetchone()[0] == 1
+    db.close()
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from tag_matrix import TagMatrix
+
+TAGS = pd.Series([
+    "[' Leisure trip ', ' Couple ', ' Stayed 2 nights ']",
+    None,
+    "[' Business trip ', ' Solo traveler ', ' Stayed 1 night ']",
+    "[' Leisure trip ', ' Couple ', ' Stayed 2 nights ']",
+    "",
+    "[' Family with young children ', ' Stayed 5 nights ', ' Leisure trip ']",
+])
+
+
+def test_from_batches_matches_from_series():
+    full = TagMatrix.from_series(TAGS)
+    batched = TagMatrix.from_batches([TAGS.iloc[:2], TAGS.iloc[2:3], TAGS.iloc[3:]])
+    assert batched.vocabulary == full.vocabulary
+    assert (batched.matrix != full.matrix).nnz == 0
+    assert np.array_equal(batched.nights, full.nights)
+    assert batched.mask(["Couple"]).tolist() == full.mask(["Couple"]).tolist()
+
+
+def test_from_batches_without_batches():
+    empty = TagMatrix.from_batches([])
+    assert len(empty) == 0 and empty.vocabulary == []
+
+
+def test_nights_mask_excludes_reviews_without_nights():
+    tag_matrix = TagMatrix.from_series(TAGS)
+    assert tag_matrix.nights.tolist() == [2, 0, 1, 2, 0, 5]
+    assert tag_matrix.nights_mask(nights_max=2).tolist() == [True, False, True, True, False, False]
+    assert tag_matrix.nights_mask(nights_min=2).tolist() == [True, False, False, True, False, True]
+    assert tag_matrix.nights_mask().all()
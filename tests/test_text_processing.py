@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from text_processing import clean_text, clean_text_series, compose_review, compose_reviews, join_reviews
+
+# Casos donde los kernels de Arrow y clean_text podrían diferir
+SAMPLES = [
+    "No Negative", "No Positive", "No NegativeNo Positive", "  No Positive  ",
+    "Great location No Negative", "No Positive staff was rude",
+    "a\vb", "\x1c a \x1d", "b\x1e\x1fc", "\x1f",
+    "caf\u00e9\u00a0 bar", "\u00a0No Negative\u00a0", "hotel\u3000room", "\u3000",
+    "", " ", "  \t\n ", "Nice   room\r\n\nclean",
+    np.nan, None, 3.5, 0, pd.NA,
+]
+
+
+def _series(values, arrow: bool) -> pd.Series:
+    series = pd.Series(values, dtype=object)
+    if arrow:
+        # En Arrow solo hay texto o nulos
+        series = series.where(series.map(lambda v: isinstance(v, str)), None).astype("string[pyarrow]")
+    return series
+
+
+@pytest.mark.parametrize("arrow", [False, True])
+def test_clean_text_series_matches_clean_text(arrow):
+    series = _series(SAMPLES, arrow)
+    assert clean_text_series(series).tolist() == series.apply(clean_text).tolist()
+
+
+@pytest.mark.parametrize("arrow", [False, True])
+def test_clean_text_series_keeps_index_and_dtype(arrow):
+    series = _series(["  No Positive ok ", None], arrow).set_axis([10, 20])
+    result = clean_text_series(series)
+    assert result.index.tolist() == [10, 20]
+    assert isinstance(result.array, pd.arrays.ArrowExtensionArray) == arrow
+
+
+@pytest.mark.parametrize("arrow", [False, True])
+def test_compose_reviews_matches_compose_review(arrow):
+    positive = _series(SAMPLES, arrow)
+    negative = _series(SAMPLES[::-1], arrow)
+    frame = pd.DataFrame({"Positive_Review": positive, "Negative_Review": negative})
+    expected = frame.apply(compose_review, axis=1).tolist()
+    assert compose_reviews(positive, negative).tolist() == expected
+
+
+@pytest.mark.parametrize("arrow", [False, True])
+def test_join_reviews_matches_compose_review(arrow):
+    positive = _series(SAMPLES, arrow)
+    negative = _series(SAMPLES[::-1], arrow)
+    frame = pd.DataFrame({"Positive_Review": positive, "Negative_Review": negative})
+    expected = frame.apply(compose_review, axis=1).tolist()
+    joined = join_reviews(clean_text_series(positive), clean_text_series(negative))
+    assert joined.tolist() == expected